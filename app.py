@@ -1,15 +1,29 @@
+import asyncio
+import ipaddress
+import secrets
 import socket
 from contextlib import asynccontextmanager
 
 import qrcode
 import uvicorn
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response
 from rich.columns import Columns
 from rich.console import Console
 from rich.panel import Panel
 
+from relay import BINARY_SUBPROTOCOL
+from relay import IMMUTABLE_CACHE_CONTROL
+from relay import METRICS_CONTENT_TYPE
+from relay import AssetStore
+from relay import CachedFile
+from relay import Frame
+from relay import Hub
+from relay import LatencyTracer
+from relay import now_ms
+from relay import render_metrics
+from relay import watch_event_loop
+
 # The port on which the FastAPI server will listen
 PORT = 8000
 
@@ -21,6 +35,17 @@ HOST = "0.0.0.0"
 # Useful in development; should be False in production
 RELOAD = False
 
+# Largest WebSocket message (in bytes) the relay accepts; bigger ones close the connection with 1009
+# Large copied_text payloads are split into chunks by the extension to stay below it
+MAX_FRAME_BYTES = 64 * 1024
+
+# Number of random bytes in a pairing session token
+# The token is carried in the QR code URL and keys the WebSocket room of a phone/browser pair
+SESSION_TOKEN_BYTES = 8
+
+# Close code for connections refused by the pairing check (policy violation)
+POLICY_VIOLATION = 1008
+
 # Rich console object for styled terminal output
 # Used to print QR codes, instructions, and panels in a readable format
 console = Console()
@@ -101,12 +126,18 @@ async def lifespan(app: FastAPI):
         None
 
     Effects:
+        - Generates the default pairing session token and stores it on `app.state.session`; it is
+          the only token in `app.state.sessions`, the tokens /ws accepts.
         - Prints an ASCII QR code to the terminal for connecting a mobile device.
+          The encoded URL carries the session token, so the phone joins that session's room.
         - Prints step-by-step instructions in the terminal using rich panels.
+        - Measures event loop lag in a background task, reported on /metrics, until shutdown.
         - Runs once when the application starts and cleans up after shutdown.
     """
+    app.state.session = secrets.token_urlsafe(SESSION_TOKEN_BYTES)
+    app.state.sessions = {app.state.session}
     url = get_server_url()
-    mobile_page_url = f"{url}/mobile_page"
+    mobile_page_url = f"{url}/mobile_page?session={app.state.session}"
     qr_ascii = generate_qr_ascii(mobile_page_url)
 
     qr_panel = Panel.fit(qr_ascii, title="Scan to Open", border_style="green")
@@ -124,55 +155,207 @@ async def lifespan(app: FastAPI):
     )
 
     console.print(Columns([qr_panel, steps_panel]))
+    lag_watcher = asyncio.create_task(watch_event_loop(hub.stats))
     yield
+    lag_watcher.cancel()
 
 
 app = FastAPI(lifespan=lifespan)
-app.mount("/resource", StaticFiles(directory="mobile_page/"), name="resource")
 
-# Store connected clients
-connected_clients: list[WebSocket] = []
+# Files under mobile_page/, held in memory and served under /resource with content-hashed URLs
+assets = AssetStore("mobile_page/", "/resource/")
+
+# The mobile page, loaded once into memory with gzip (and, if brotli is installed, br) variants and reloaded
+# when the file changes
+# Its references to /resource files are rewritten to their hashed, immutable URLs, and it is
+# rebuilt when any of those files changes (checked at most once per ASSET_CHECK_INTERVAL) so it never
+# links to an outdated name
+mobile_page = CachedFile(
+    "mobile_page/index.html", "text/html; charset=utf-8", transform=assets.rewrite_urls, depends_on=assets.version
+)
+
+# Store connected clients, each with its own outbound queue and writer task
+hub = Hub()
+
+# Latency histograms of traced gestures, and the reference clock for the phone and extension
+tracer = LatencyTracer()
 
 
 @app.get("/mobile_page")
-async def get_mobile_page():
+async def get_mobile_page(request: Request):
     """
     Serve the main HTML page for mobile clients.
 
+    Parameters:
+        request (Request): The incoming request.
+
     Returns:
-        HTMLResponse: The contents of "mobile_page/index.html" as an HTML response.
+        Response: The in-memory copy of "mobile_page/index.html", or 304 Not Modified.
 
     Notes:
         - The HTML page allows the mobile device to interact with the WebSocket server.
+        - Served with a strong ETag; a matching If-None-Match gets an empty 304.
+        - Served gzip compressed when the client accepts it, or brotli when the optional brotli package is installed.
+    """
+    return mobile_page.response(request)
+
+
+@app.api_route("/resource/{path:path}", methods=["GET", "HEAD"])
+async def get_resource(path: str, request: Request):
+    """
+    Serve a file from mobile_page/ (images, the page's Python code).
+
+    Parameters:
+        path (str): The file's path, either plain or content-hashed.
+        request (Request): The incoming request.
+
+    Returns:
+        Response: The file from memory, 304 Not Modified, or a byte range of it.
+
+    Notes:
+        - Hashed URLs are served with `Cache-Control: immutable`, so browsers never revalidate them.
+        - Plain URLs keep working and are revalidated with their ETag.
+        - Compressed variants are precomputed when they are smaller than the file.
+        - Answers HEAD requests too, with the headers of the matching GET and no body.
+    """
+    found = assets.get(path)
+    if found is None:
+        raise HTTPException(status_code=404)
+    file, hashed = found
+    return file.response(request, IMMUTABLE_CACHE_CONTROL if hashed else None)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """
+    Expose relay metrics in the Prometheus text format.
+
+    Returns:
+        Response: Connected clients, per connection bytes in flight, queued and dropped frames,
+        messages and bytes relayed per type, send duration and event loop lag histograms,
+        clients removed by the relay, and per-stage latency histograms of traced gestures.
+    """
+    return Response(render_metrics(hub, tracer), media_type=METRICS_CONTENT_TYPE)
+
+
+def is_loopback(websocket: WebSocket) -> bool:
     """
-    with open("mobile_page/index.html") as f:
-        return HTMLResponse(f.read())
+    Tell whether a WebSocket connection comes from this machine.
+
+    Parameters:
+        websocket (WebSocket): The incoming WebSocket connection.
+
+    Returns:
+        bool: True for connections from a loopback address.
+    """
+    if websocket.client is None:
+        return False
+    try:
+        return ipaddress.ip_address(websocket.client.host).is_loopback
+    except ValueError:
+        return False
+
+
+async def refuse(websocket: WebSocket):
+    """
+    Close a WebSocket connection that failed the pairing check.
+
+    Parameters:
+        websocket (WebSocket): The incoming WebSocket connection, not yet accepted.
+
+    Notes:
+        - The connection is accepted first: closing it during the handshake answers with a plain
+          HTTP 403, which browsers report as close code 1006, so the page could not tell why.
+    """
+    await websocket.accept()
+    await websocket.close(code=POLICY_VIOLATION)
 
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """
-    WebSocket endpoint to broadcast messages between connected clients.
+    WebSocket endpoint for phones, joining the room of their pairing session.
 
     Parameters:
         websocket (WebSocket): The incoming WebSocket connection.
 
     Effects:
-        - Accepts the WebSocket connection and adds it to the connected clients list.
-        - Receives messages from one client and forwards them to all other connected clients.
-        - Removes the client from the list when it disconnects.
+        - Closes the connection with 1008 (policy violation) unless its `session` query
+          parameter is a token issued by this server run (`app.state.sessions`), so a page
+          holding a token from an earlier run fails loudly instead of joining an empty room.
+        - Otherwise relays the connection's frames within that session (see relay_session).
     """
-    await websocket.accept()
-    connected_clients.append(websocket)
+    session = websocket.query_params.get("session")
+    if session not in websocket.app.state.sessions:
+        await refuse(websocket)
+        return
+    await relay_session(websocket, session)
+
+
+@app.websocket("/ws/extension")
+async def extension_websocket_endpoint(websocket: WebSocket):
+    """
+    WebSocket endpoint for the browser extension, joining the session shown in the terminal QR code.
+
+    Parameters:
+        websocket (WebSocket): The incoming WebSocket connection.
+
+    Effects:
+        - Closes the connection with 1008 (policy violation) unless it comes from this machine:
+          the extension runs in the browser next to the server, and the pairing token is the
+          only thing that lets a device on the network in.
+        - Otherwise relays the connection's frames within the default session (see relay_session).
+    """
+    if not is_loopback(websocket):
+        await refuse(websocket)
+        return
+    await relay_session(websocket, websocket.app.state.session)
+
+
+async def relay_session(websocket: WebSocket, session: str):
+    """
+    Broadcast messages between the connected clients of one pairing session.
+
+    Parameters:
+        websocket (WebSocket): The incoming WebSocket connection, not yet accepted.
+        session (str): The pairing session token; it keys the client's room.
+
+    Effects:
+        - Accepts the WebSocket connection and registers it in the room of its session.
+        - Negotiates binary gesture frames when the client offers BINARY_SUBPROTOCOL.
+        - Answers clock-sync pings and records latency trace reports instead of relaying them,
+          and stamps traced gesture frames with their receive time (see relay.tracing).
+        - Closes the connection with 1009 (message too big) for messages over MAX_FRAME_BYTES.
+        - Counts received messages and bytes per message type for /metrics.
+        - Receives text or binary messages from one client and queues them for the other clients in its room.
+          Delivery happens concurrently in per-client writer tasks, so a slow peer never
+          holds up the sender or the other peers. Binary frames are forwarded unchanged to
+          clients that negotiated them and as JSON to the rest.
+        - Removes the client from the hub when it disconnects or is evicted.
+    """
+    binary = BINARY_SUBPROTOCOL in websocket.scope.get("subprotocols", [])
+    await websocket.accept(subprotocol=BINARY_SUBPROTOCOL if binary else None)
+    client = hub.join(websocket, session, binary)
     try:
-        while True:
-            data = await websocket.receive_text()
-            for client in connected_clients:
-                if client != websocket:
-                    await client.send_text(data)
+        while not client.closed:
+            message = await websocket.receive()
+            received = now_ms()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            data = message.get("bytes")
+            frame = Frame(message["text"] if data is None else data)
+            if frame.size > MAX_FRAME_BYTES:
+                await websocket.close(code=1009)
+                break
+            if tracer.handle(client, frame, received):
+                continue
+            hub.stats.count_received(frame)
+            hub.broadcast(client, frame)
     except WebSocketDisconnect:
-        connected_clients.remove(websocket)
+        pass
+    finally:
+        await hub.leave(client)
 
 
 if __name__ == "__main__":
-    uvicorn.run("app:app", host=HOST, port=PORT, reload=RELOAD)
+    uvicorn.run("app:app", host=HOST, port=PORT, reload=RELOAD, ws_max_size=MAX_FRAME_BYTES)
@@ -0,0 +1,126 @@
+"""
+Startup cost of loading the extension's Python code, per page load.
+
+Run from the repository root:
+    python -m benchmarks.extension_startup
+
+Compares the work the interpreter does before main.py can run (times in ms):
+- source loader: parse and run the generated script that embeds every utils/*.py file in a
+  string and writes it to the filesystem, then compile every module;
+- bundle: write the zip, then load every module's code through zipimport, from sources only
+  and with precompiled bytecode (built for this interpreter, as build_bundle.py --pyc does
+  for Pyodide's).
+The code is only loaded, not executed, since it needs a browser. Fetching and Pyodide's
+own startup are the same in every case and are not included.
+
+The bundle is only used while it matches the sources (see bundleIsCurrent in content.js),
+so its rows include that check. A second table lists what the check reads on a normal boot
+(the digest file; the verdict comes from chrome.storage) and on the first boot after the
+extension is reloaded (every source file, hashed; in pure Python here, which is slower than
+the JS hash).
+"""
+
+import importlib.util
+import os
+import statistics
+import sys
+import tempfile
+import time
+import zipimport
+from pathlib import Path
+
+# build_bundle.py is a script, not part of a package; load it by path
+_spec = importlib.util.spec_from_file_location("build_bundle", "browser_extension/build_bundle.py")
+build_bundle = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(build_bundle)
+
+# Runs per scenario
+RUNS = 50
+
+
+def source_loader() -> str:
+    """The script content.js generates without a bundle (same escaping as the JS)."""
+    script = 'import os\nos.makedirs("utils", exist_ok=True)\n'
+    main_code = ""
+    for source, name in build_bundle.bundle_files():
+        code = source.read_text()
+        if name == "main.py":
+            main_code = code
+            continue
+        escaped = code.replace("\\", "\\\\").replace('"""', '\\"""')
+        script += f'with open("{name}", "w") as fp:\n    fp.write("""{escaped}""")\n\n'
+    return script + "\n\n" + main_code.replace("\n", "\n# ")  # main.py is compiled below, not run
+
+
+def run_source_loader(script: str, directory: str):
+    """Run the generated script, then compile every written module like a first import."""
+    exec(compile(script, "<py-script>", "exec"), {})
+    for _, name in build_bundle.bundle_files():
+        if name != "main.py":
+            compile(Path(directory, name).read_bytes(), name, "exec")
+    compile(Path(build_bundle.EXTENSION_DIR, "main.py").read_bytes(), "main.py", "exec")
+
+
+def check_bundle(digest_path: Path, stored: str) -> bool:
+    """The bundle check of a normal boot: read the digest file and compare it to the stored verdict's."""
+    return digest_path.read_text().strip() == stored
+
+
+def verify_bundle(digest_path: Path) -> bool:
+    """The bundle check of the first boot after a reload: read and hash every source file."""
+    return digest_path.read_text().strip() == build_bundle.source_digest()
+
+
+def run_bundle(data: bytes, digest_path: Path, stored: str, directory: str):
+    """Check the bundle, write it to the filesystem and load every module's code with zipimport."""
+    check_bundle(digest_path, stored)
+    path = os.path.join(directory, "misclick.zip")
+    with open(path, "wb") as fp:
+        fp.write(data)
+    importer = zipimport.zipimporter(path)
+    utils = zipimport.zipimporter(os.path.join(path, "utils"))
+    importer.get_code("main")
+    for _, name in build_bundle.bundle_files():
+        if name != "main.py":
+            utils.get_code(Path(name).stem)
+
+
+def measure(run, *args) -> float:
+    """Median time of RUNS calls, in ms, each in a fresh working directory."""
+    samples = []
+    cwd = os.getcwd()
+    for _ in range(RUNS):
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            try:
+                start = time.perf_counter()
+                run(*args, directory)
+                samples.append(time.perf_counter() - start)
+            finally:
+                os.chdir(cwd)
+            zipimport._zip_directory_cache.clear()
+    return statistics.median(samples) * 1000
+
+
+def main():
+    script = source_loader()
+    with tempfile.TemporaryDirectory() as directory:
+        sources = build_bundle.build(Path(directory, "src.zip")).read_bytes()
+        compiled = build_bundle.build(Path(directory, "pyc.zip"), pyc=True, target_python=sys.version_info[:2])
+        compiled = compiled.read_bytes()
+        digest_path = Path(directory, "src.digest")
+        digest = digest_path.read_text()
+        source_bytes = sum(source.stat().st_size for source, _ in build_bundle.bundle_files())
+
+        print(f"{'loader':<22}{'bytes':>9}{'ms':>9}")
+        print(f"{'source loader':<22}{len(script.encode()):>9}{measure(run_source_loader, script):>9.2f}")
+        print(f"{'bundle (sources)':<22}{len(sources):>9}{measure(run_bundle, sources, digest_path, digest):>9.2f}")
+        print(f"{'bundle (bytecode)':<22}{len(compiled):>9}{measure(run_bundle, compiled, digest_path, digest):>9.2f}")
+        print()
+        print(f"{'bundle check':<22}{'bytes':>9}{'ms':>9}")
+        print(f"{'normal boot':<22}{len(digest):>9}{measure(lambda _: check_bundle(digest_path, digest)):>9.2f}")
+        print(f"{'first after reload':<22}{source_bytes:>9}{measure(lambda _: verify_bundle(digest_path)):>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
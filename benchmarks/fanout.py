@@ -0,0 +1,112 @@
+"""
+Fan-out latency benchmark for the /ws relay.
+
+Run from the repository root:
+    python -m benchmarks.fanout
+
+Frames arrive at a fixed rate and are forwarded to 1, 10 and 100 simulated peers. With more
+than one peer, one of them is a slow consumer. The reported numbers are latency percentiles
+(in ms) between a frame arriving at the relay and it being written to each healthy peer,
+for the previous serial `await client.send_text(...)` loop and for the Hub.
+"""
+
+import asyncio
+import statistics
+import time
+
+from relay import Frame
+from relay import Hub
+
+# Number of frames pushed through the relay per run
+FRAMES = 200
+
+# Seconds between incoming frames (200 Hz)
+FRAME_INTERVAL = 0.005
+
+# Seconds a send takes on the slow peer
+SLOW_SEND_DELAY = 0.05
+
+# Peer counts to benchmark
+CLIENT_COUNTS = [1, 10, 100]
+
+# Pairing session all simulated peers join
+ROOM = "bench"
+
+
+class FakeWebSocket:
+    """Stand-in for a WebSocket that records how late each frame was delivered."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.latencies: list[float] = []
+
+    async def send_text(self, data: str):
+        await asyncio.sleep(self.delay)
+        self.latencies.append(time.perf_counter() - float(data))
+
+    async def close(self, code: int = 1000):
+        pass
+
+
+def make_peers(count: int) -> list[FakeWebSocket]:
+    """Create `count` peers, the middle one being slow when there is more than one."""
+    peers = [FakeWebSocket(0) for _ in range(count)]
+    if count > 1:
+        peers[count // 2] = FakeWebSocket(SLOW_SEND_DELAY)
+    return peers
+
+
+async def wait_for_arrival(start: float, index: int) -> str:
+    """Sleep until frame `index` is due and return its arrival timestamp as the payload."""
+    arrival = start + index * FRAME_INTERVAL
+    delay = arrival - time.perf_counter()
+    if delay > 0:
+        await asyncio.sleep(delay)
+    return str(arrival)
+
+
+async def run_serial(peers: list[FakeWebSocket]):
+    """The previous relay loop: await every send in turn before reading the next frame."""
+    start = time.perf_counter()
+    for i in range(FRAMES):
+        data = await wait_for_arrival(start, i)
+        for peer in peers:
+            await peer.send_text(data)
+
+
+async def run_hub(peers: list[FakeWebSocket]):
+    """The Hub: queue the frame for every peer and let writer tasks deliver concurrently."""
+    hub = Hub()
+    sender = hub.join(FakeWebSocket(0), ROOM)
+    clients = [hub.join(peer, ROOM) for peer in peers]
+    healthy = [peer for peer in peers if peer.delay == 0]
+
+    start = time.perf_counter()
+    for i in range(FRAMES):
+        data = await wait_for_arrival(start, i)
+        hub.broadcast(sender, Frame(data))
+
+    while any(len(peer.latencies) < FRAMES for peer in healthy):
+        await asyncio.sleep(FRAME_INTERVAL)
+    for client in [sender, *clients]:
+        await hub.leave(client)
+
+
+def percentiles(peers: list[FakeWebSocket]) -> str:
+    """Format p50/p95/p99 latency in ms across all healthy peers."""
+    samples = [latency * 1000 for peer in peers if peer.delay == 0 for latency in peer.latencies]
+    q = statistics.quantiles(samples, n=100)
+    return f"p50={q[49]:8.2f}  p95={q[94]:8.2f}  p99={q[98]:8.2f}"
+
+
+async def main():
+    print(f"{FRAMES} frames every {FRAME_INTERVAL * 1000:.0f} ms, slow peer {SLOW_SEND_DELAY * 1000:.0f} ms/send")
+    for count in CLIENT_COUNTS:
+        for name, run in [("serial", run_serial), ("hub", run_hub)]:
+            peers = make_peers(count)
+            await run(peers)
+            print(f"{count:>4} clients  {name:<6}  {percentiles(peers)}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Load test for the /mobile_page endpoint.
+
+Run from the repository root:
+    python -m benchmarks.page_load
+
+Requests are issued in-process through an ASGI transport and bodies are read without
+decompressing them, so the numbers reflect the handler rather than the network or the
+client's gzip decoding. Reports requests/sec for the previous handler (read the
+file on every request, uncompressed), the cached handler, and the cached handler answering
+revalidations with 304.
+"""
+
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import HTMLResponse
+
+from app import app
+
+# Total requests per scenario
+REQUESTS = 5_000
+
+# Requests in flight at once
+CONCURRENCY = 50
+
+# Headers a typical mobile browser sends
+BROWSER_HEADERS = {"Accept-Encoding": "gzip, deflate, br"}
+
+baseline = FastAPI()
+
+
+@baseline.get("/mobile_page")
+async def get_mobile_page_from_disk():
+    """The previous handler: read index.html from disk on every request."""
+    with open("mobile_page/index.html") as f:
+        return HTMLResponse(f.read())
+
+
+async def measure(target: FastAPI, headers: dict) -> tuple[float, int]:
+    """Issue REQUESTS requests with CONCURRENCY workers and return (requests/sec, bytes/response)."""
+    transport = httpx.ASGITransport(app=target)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        sizes = []
+
+        async def worker(count: int):
+            for _ in range(count):
+                async with client.stream("GET", "/mobile_page", headers=headers) as response:
+                    sizes.append(sum([len(chunk) async for chunk in response.aiter_raw()]))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker(REQUESTS // CONCURRENCY) for _ in range(CONCURRENCY)))
+        elapsed = time.perf_counter() - start
+    return len(sizes) / elapsed, sizes[0]
+
+
+async def main():
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        etag = (await client.get("/mobile_page", headers=BROWSER_HEADERS)).headers["etag"]
+
+    scenarios = [
+        ("before: read from disk", baseline, BROWSER_HEADERS),
+        ("after: in-memory cache", app, BROWSER_HEADERS),
+        ("after: If-None-Match 304", app, {**BROWSER_HEADERS, "If-None-Match": etag}),
+    ]
+    print(f"{REQUESTS} requests, {CONCURRENCY} concurrent")
+    for name, target, headers in scenarios:
+        rate, size = await measure(target, headers)
+        print(f"{name:<26}{rate:>10.0f} req/s{size:>8} bytes/response")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
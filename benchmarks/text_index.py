@@ -0,0 +1,113 @@
+"""
+Benchmark of the drag-to-copy text lookup on synthetic pages.
+
+Run from the repository root:
+    python -m benchmarks.text_index
+
+Pages of 1k, 10k and 100k text nodes are laid out as lines of words in a single column,
+with some nodes wrapping over two lines. For each page it reports the time (in ms) of one
+drag-sized rectangle query scanning every text rectangle, as the extension did on every
+drag, and with the GridIndex, plus the one-off cost of building the grid. In the browser
+the scan additionally pays for a Range and getClientRects call per text node, so the real
+gap is wider.
+"""
+
+import importlib.util
+import random
+import time
+
+# The extension's utils package imports browser-only modules, so load the index on its own
+_spec = importlib.util.spec_from_file_location("spatial_index", "browser_extension/utils/spatial_index.py")
+spatial_index = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(spatial_index)
+
+# Text node counts of the synthetic pages
+NODE_COUNTS = [1_000, 10_000, 100_000]
+
+# Rectangle queries per page
+QUERIES = 200
+
+# Size (px) of the dragged rectangle
+DRAG_WIDTH = 400
+DRAG_HEIGHT = 200
+
+# Layout of the synthetic page
+COLUMN_WIDTH = 1200
+LINE_HEIGHT = 20
+WORD_HEIGHT = 16
+
+# One node in this many wraps onto the next line, producing two rectangles
+WRAP_EVERY = 7
+
+
+def make_page(count: int) -> list[list[tuple[float, float, float, float]]]:
+    """Lay out `count` text nodes and return the client rects of each, in document order."""
+    rng = random.Random(count)
+    nodes = []
+    x = y = 0.0
+    for i in range(count):
+        width = rng.uniform(30, 120)
+        if x + width > COLUMN_WIDTH or i % WRAP_EVERY == 0 and x > 0:
+            head = COLUMN_WIDTH - x
+            rects = [(x, y, COLUMN_WIDTH, y + WORD_HEIGHT)] if i % WRAP_EVERY == 0 and head > 0 else []
+            x, y = 0.0, y + LINE_HEIGHT
+            width = max(width - head, 10) if rects else width
+            rects.append((x, y, x + width, y + WORD_HEIGHT))
+        else:
+            rects = [(x, y, x + width, y + WORD_HEIGHT)]
+        nodes.append(rects)
+        x += width + 4
+    return nodes
+
+
+def scan(nodes: list, left: float, top: float, right: float, bottom: float) -> list[int]:
+    """The previous lookup: test every rectangle of every text node."""
+    matches = []
+    for key, rects in enumerate(nodes):
+        for r_left, r_top, r_right, r_bottom in rects:
+            if not (r_right < left or r_left > right or r_bottom < top or r_top > bottom):
+                matches.append(key)
+                break
+    return matches
+
+
+def build(nodes: list) -> "spatial_index.GridIndex":
+    """Index every rectangle of the page."""
+    grid = spatial_index.GridIndex()
+    for key, rects in enumerate(nodes):
+        for rect in rects:
+            grid.insert(key, *rect)
+    return grid
+
+
+def main():
+    print(f"{QUERIES} queries of {DRAG_WIDTH}x{DRAG_HEIGHT} px, times in ms")
+    print(f"{'nodes':>7}  {'scan/query':>11}  {'grid/query':>11}  {'grid build':>11}")
+    for count in NODE_COUNTS:
+        nodes = make_page(count)
+        page_height = max(rect[3] for rects in nodes for rect in rects)
+        rng = random.Random(0)
+        queries = []
+        for _ in range(QUERIES):
+            left = rng.uniform(0, COLUMN_WIDTH - DRAG_WIDTH)
+            top = rng.uniform(0, max(page_height - DRAG_HEIGHT, 0))
+            queries.append((left, top, left + DRAG_WIDTH, top + DRAG_HEIGHT))
+
+        start = time.perf_counter()
+        grid = build(nodes)
+        build_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = [scan(nodes, *query) for query in queries]
+        scan_time = (time.perf_counter() - start) / QUERIES
+
+        start = time.perf_counter()
+        found = [[key for key, _ in grid.query(*query)] for query in queries]
+        grid_time = (time.perf_counter() - start) / QUERIES
+
+        assert found == expected, "grid and scan disagree"
+        print(f"{count:>7}  {scan_time * 1000:>11.3f}  {grid_time * 1000:>11.3f}  {build_time * 1000:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Microbenchmark of the JSON and binary gesture wire formats.
+
+Run from the repository root:
+    python -m benchmarks.wire_format
+
+For each format it reports the frame size and the time per frame (in µs) to encode it on
+the phone, relay it through the Hub to one peer, and decode it in the extension.
+"""
+
+import asyncio
+import json
+import time
+import timeit
+
+from relay import Frame
+from relay import Hub
+from relay import decode_gesture
+from relay import encode_gesture
+
+# Number of frames per measurement
+FRAMES = 20_000
+
+# A representative gesture
+GESTURE = {"seq": 1, "x": 0.1234, "y": -0.0567, "click": 0, "fingers": 1, "type": "scroll"}
+
+
+def json_encode() -> str:
+    """The previous sendCoords payload, including the unused browser dimensions."""
+    payload = {
+        "x": GESTURE["x"],
+        "y": GESTURE["y"],
+        "click": GESTURE["click"],
+        "fingers": GESTURE["fingers"],
+        "browser_width": 412,
+        "browser_height": 915,
+        "type": GESTURE["type"],
+    }
+    return json.dumps(payload)
+
+
+def binary_encode() -> bytes:
+    """The binary frame sent once BINARY_SUBPROTOCOL is negotiated."""
+    return encode_gesture(
+        GESTURE["seq"], GESTURE["x"], GESTURE["y"], GESTURE["click"], GESTURE["fingers"], GESTURE["type"]
+    )
+
+
+class SignallingWebSocket:
+    """Peer that signals every frame it receives."""
+
+    def __init__(self):
+        self.delivered = asyncio.Event()
+
+    async def send_text(self, data: str):
+        self.delivered.set()
+
+    async def send_bytes(self, data: bytes):
+        self.delivered.set()
+
+
+async def relay(data: str | bytes, binary: bool) -> float:
+    """Push FRAMES copies of `data` through a Hub, one at a time, and return seconds per frame."""
+    hub = Hub()
+    sender = hub.join(SignallingWebSocket(), "bench", binary)
+    peer_socket = SignallingWebSocket()
+    peer = hub.join(peer_socket, "bench", binary)
+
+    start = time.perf_counter()
+    for _ in range(FRAMES):
+        peer_socket.delivered.clear()
+        hub.broadcast(sender, Frame(data))
+        await peer_socket.delivered.wait()
+    elapsed = time.perf_counter() - start
+
+    await hub.leave(sender)
+    await hub.leave(peer)
+    return elapsed / FRAMES
+
+
+def per_frame(func, *args) -> float:
+    """Best-of-5 seconds per call."""
+    return min(timeit.repeat(lambda: func(*args), number=FRAMES, repeat=5)) / FRAMES
+
+
+def main():
+    json_frame = json_encode()
+    binary_frame = binary_encode()
+    rows = [
+        ("json", json_frame, json_encode, json.loads, False),
+        ("binary", binary_frame, binary_encode, decode_gesture, True),
+    ]
+    print(f"{'format':<8}{'bytes':>7}{'encode µs':>12}{'relay µs':>12}{'decode µs':>12}")
+    for name, frame, encode, decode, binary in rows:
+        encode_time = per_frame(encode)
+        relay_time = asyncio.run(relay(frame, binary))
+        decode_time = per_frame(decode, frame)
+        print(f"{name:<8}{len(frame):>7}{encode_time * 1e6:>12.2f}{relay_time * 1e6:>12.2f}{decode_time * 1e6:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
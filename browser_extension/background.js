@@ -0,0 +1,110 @@
+// --- Shared relay connection ---
+// The extension keeps a single WebSocket to the relay here, in the background service worker,
+// instead of one per tab. Frames from the phone are forwarded to the active tab only, and
+// copied text from that tab is sent back over the same socket, so the number of relay
+// connections no longer grows with the number of open tabs.
+
+// Relay endpoint for the extension (joins the default session shown in the server's QR code;
+// the relay only accepts it from this machine)
+const RELAY_URL = "ws://localhost:8000/ws/extension";
+
+// WebSocket subprotocol that negotiates binary gesture frames (mirrors relay/wire.py)
+const BINARY_SUBPROTOCOL = "misclick.bin.v1";
+
+// Milliseconds to wait before reconnecting when the relay is not reachable
+const RECONNECT_DELAY_MS = 5000;
+
+// Milliseconds between keepalive pings; socket traffic keeps the service worker alive
+const KEEPALIVE_INTERVAL_MS = 20000;
+
+// Start of clock-sync frames as Python's json.dumps writes them (see relay/tracing.py)
+// Pings come from booted tabs; each pong goes back to the tab that sent the ping, not the
+// active one, so it neither wakes other tabs nor gets lost when the pinging tab is hidden
+const PING_PREFIX = '{"type": "ping"';
+const PONG_PREFIX = '{"type": "pong"';
+
+// chrome.storage.local key of content.js's bundle check (mirrors content.js)
+const BUNDLE_CHECK_KEY = "bundleCheck";
+
+let socket = null;
+let activeTabId = null;
+
+// Tab waiting for each pong, keyed by the ping's timestamp
+const pendingPings = new Map();
+
+function connect() {
+    socket = new WebSocket(RELAY_URL, [BINARY_SUBPROTOCOL]);
+    socket.binaryType = "arraybuffer";
+    socket.onopen = () => forward({type: "open"});
+    socket.onmessage = (event) => {
+        // Extension messaging only carries JSON, so binary frames travel base64 encoded
+        if (typeof event.data === "string" && event.data.startsWith(PONG_PREFIX)) {
+            const {t} = JSON.parse(event.data);
+            const tabId = pendingPings.get(t);
+            pendingPings.delete(t);
+            if (tabId !== undefined) {
+                sendToTab(tabId, {type: "message", data: event.data});
+            }
+        } else if (typeof event.data === "string") {
+            forward({type: "message", data: event.data});
+        } else {
+            const bytes = new Uint8Array(event.data);
+            forward({type: "message", binary: btoa(String.fromCharCode(...bytes))});
+        }
+    };
+    socket.onclose = () => {
+        forward({type: "close"});
+        socket = null;
+        pendingPings.clear();
+        setTimeout(connect, RECONNECT_DELAY_MS);
+    };
+}
+
+// Track the tab the user is looking at, the only one the phone drives
+async function refreshActiveTab() {
+    const [tab] = await chrome.tabs.query({active: true, lastFocusedWindow: true});
+    activeTabId = tab ? tab.id : null;
+}
+
+function forward(message) {
+    if (activeTabId !== null) {
+        sendToTab(activeTabId, message);
+    }
+}
+
+function sendToTab(tabId, message) {
+    // Pages without the content script (e.g. chrome:// pages) reject the message
+    chrome.tabs.sendMessage(tabId, {relay: message}).catch(() => {});
+}
+
+// Installing, updating or reloading the extension may change its Python sources: make the next
+// page boot check the bundle against them again
+chrome.runtime.onInstalled.addListener(() => chrome.storage.local.remove(BUNDLE_CHECK_KEY));
+
+chrome.tabs.onActivated.addListener(({tabId}) => {
+    activeTabId = tabId;
+});
+chrome.windows.onFocusChanged.addListener(refreshActiveTab);
+
+// Requests from content scripts: relay status and frames to send
+chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
+    if (message.type === "status") {
+        sendResponse({open: socket !== null && socket.readyState === WebSocket.OPEN});
+    } else if (message.type === "send" && socket && socket.readyState === WebSocket.OPEN) {
+        if (sender.tab && message.data.startsWith(PING_PREFIX)) {
+            pendingPings.set(JSON.parse(message.data).t, sender.tab.id);
+        }
+        socket.send(message.data);
+    }
+});
+
+setInterval(() => {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+        // A ping is answered by the relay itself (relay/tracing.py) instead of being fanned
+        // out to the phone; its pong matches no tab and is dropped above
+        socket.send(JSON.stringify({type: "ping", t: Date.now()}));
+    }
+}, KEEPALIVE_INTERVAL_MS);
+
+refreshActiveTab();
+connect();
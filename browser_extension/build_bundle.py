@@ -0,0 +1,103 @@
+"""
+Package the extension's Python code into a single zip that Pyodide imports directly.
+
+Run from the repository root:
+    python browser_extension/build_bundle.py [--pyc]
+
+Without a bundle, content.js fetches every utils/*.py file, embeds them in one large
+Python source string that writes them to the in-browser filesystem, and only then runs
+main.py. With the bundle, the runtime fetches one file, puts it on sys.path and imports
+`main` from it with zipimport.
+
+--pyc additionally stores precompiled bytecode next to the sources. Bytecode only loads on
+the same Python version, so it is only written when this script runs on the Python version
+of the bundled Pyodide (PYODIDE_PYTHON); otherwise the sources alone are packaged.
+"""
+
+import argparse
+import importlib.util
+import marshal
+import sys
+import zipfile
+from pathlib import Path
+
+# Directory of the extension
+EXTENSION_DIR = Path(__file__).parent
+
+# Where the bundle is written; content.js falls back to its old loader when it is missing
+BUNDLE_PATH = EXTENSION_DIR / "bundle" / "misclick.zip"
+
+# Python version of the Pyodide release in runtime/ (0.21.3)
+PYODIDE_PYTHON = (3, 10)
+
+# .pyc flags field (PEP 552): hash-based, source not checked
+PYC_UNCHECKED_HASH = (1).to_bytes(4, "little")
+
+# 32-bit FNV-1a parameters of the source digest (content.js computes the same one)
+FNV_OFFSET = 0x811C9DC5
+FNV_PRIME = 0x01000193
+
+
+def bundle_files() -> list[tuple[Path, str]]:
+    """List (source file, path inside the zip) of every module in the bundle."""
+    files = [(EXTENSION_DIR / "main.py", "main.py")]
+    files += [(path, f"utils/{path.name}") for path in sorted((EXTENSION_DIR / "utils").glob("*.py"))]
+    return files
+
+
+def build(path: Path = BUNDLE_PATH, pyc: bool = False, target_python: tuple = PYODIDE_PYTHON) -> Path:
+    """
+    Write the bundle.
+
+    Parameters:
+        path (Path): Where to write the zip.
+        pyc (bool): Whether to include precompiled bytecode, if the Python version allows it.
+        target_python (tuple): (major, minor) version of the Python that will import the bundle.
+
+    Returns:
+        Path: The written zip.
+
+    Notes:
+        - Bytecode is stored as unchecked hash-based .pyc files, so zipimport uses it without
+          comparing timestamps against the sources.
+        - The digest of the sources is written next to the zip (same name, ".digest"); content.js
+          only uses the bundle while it matches the extension's current sources.
+    """
+    if pyc and sys.version_info[:2] != tuple(target_python):
+        print(
+            f"Skipping bytecode: Python {sys.version_info[0]}.{sys.version_info[1]} cannot produce bytecode for "
+            f"Python {target_python[0]}.{target_python[1]}"
+        )
+        pyc = False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for source, name in bundle_files():
+            code = source.read_bytes()
+            bundle.writestr(name, code)
+            if pyc:
+                compiled = compile(code, name, "exec", dont_inherit=True)
+                header = importlib.util.MAGIC_NUMBER + PYC_UNCHECKED_HASH + importlib.util.source_hash(code)
+                bundle.writestr(name + "c", header + marshal.dumps(compiled))
+    path.with_suffix(".digest").write_text(source_digest())
+    return path
+
+
+def source_digest() -> str:
+    """
+    Fingerprint of every bundled source file, to detect a bundle older than the sources.
+
+    Returns:
+        str: 32-bit FNV-1a of each path and content, NUL separated, as 8 hex digits.
+    """
+    digest = FNV_OFFSET
+    for source, name in bundle_files():
+        for byte in name.encode() + b"\0" + source.read_bytes() + b"\0":
+            digest = ((digest ^ byte) * FNV_PRIME) & 0xFFFFFFFF
+    return f"{digest:08x}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pyc", action="store_true", help="include precompiled bytecode")
+    args = parser.parse_args()
+    print(f"Wrote {build(pyc=args.pyc)}")
@@ -1,9 +1,121 @@
-function injectWhenReady() {
-    // Ensure the DOM is ready before injecting anything
-    if (!document.head || !document.body) {
-        requestAnimationFrame(injectWhenReady);
+// --- Cursor image ---
+// The fake cursor's image ships with the extension. Expose it to the page as a CSS custom
+// property right away, so the cursor paints on first render with no network request
+document.documentElement.style.setProperty(
+    '--misclick-cursor-image',
+    `url("${chrome.runtime.getURL('static/mouse_pointer.png')}")`
+);
+
+// --- Runtime boot mode ---
+// With LAZY_RUNTIME_BOOT, the Python runtime (Pyodide, tens of MB and seconds of CPU per tab)
+// is only loaded once the paired phone sends a gesture to this tab. The background worker
+// only forwards gestures to the active tab, so tabs the phone never drives stay cheap.
+// The gesture that wakes the tab is not replayed; the cursor follows from the next one.
+const LAZY_RUNTIME_BOOT = true;
+
+// Prebuilt zip of main.py and utils/, see browser_extension/build_bundle.py
+const BUNDLE_PATH = "bundle/misclick.zip";
+
+// Digest of the sources the bundle was built from, written next to it by build_bundle.py
+const BUNDLE_DIGEST_PATH = "bundle/misclick.digest";
+
+// chrome.storage.local key of the last bundle check, {digest, current}; background.js clears it
+// whenever the extension is installed or reloaded, so the sources are hashed once per load of the
+// extension instead of on every page
+const BUNDLE_CHECK_KEY = "bundleCheck";
+
+// utils/*.py files of the extension; must list every file build_bundle.py packs
+const UTILS_FILES = [
+    "__init__.py",
+    "click_targets.py",
+    "clock_sync.py",
+    "cursor_state.py",
+    "easter_eggs.py",
+    "fake_cursor.py",
+    "latency_overlay.py",
+    "logger.py",
+    "make_highlights.py",
+    "move_and_click.py",
+    "proxies.py",
+    "relay_bridge.py",
+    "spatial_index.py",
+    "toast.py",
+    "wire.py"
+    // Add more utils/*.py files here if needed
+];
+
+// Gesture types that wake a tab (mirrors relay/wire.py); other frames, such as copied text,
+// never boot the runtime
+const GESTURE_TYPES = ["touch", "scroll", "drag", "move"];
+
+// --- Relay bridge ---
+// The relay socket lives in the background worker (background.js). Its frames reach this
+// content script through extension messaging and are handed to the Python runtime, which
+// runs in the page, with window.postMessage; the same way back for frames Python sends.
+// Source tags telling our window messages apart from the page's own
+const FROM_RELAY = "misclick-relay";
+const TO_RELAY = "misclick-python";
+
+let runtimeBooted = false;
+
+function postToPython(message) {
+    window.postMessage({source: FROM_RELAY, ...message}, "*");
+}
+
+// Whether a relayed frame is a gesture from the phone: binary, or JSON (single or batch) with a gesture type
+function isGesture(relay) {
+    if (relay.type !== "message") {
+        return false;
+    }
+    if (relay.binary !== undefined) {
+        return true;
+    }
+    try {
+        const data = JSON.parse(relay.data);
+        const first = Array.isArray(data) ? data[0] : data;
+        return Boolean(first) && GESTURE_TYPES.includes(first.type);
+    } catch {
+        return false;
+    }
+}
+
+chrome.runtime.onMessage.addListener(({relay}) => {
+    if (!relay) {
         return;
     }
+    if (!runtimeBooted) {
+        if (LAZY_RUNTIME_BOOT && document.body && isGesture(relay)) {
+            bootRuntime();
+        }
+        return;
+    }
+    if (relay.binary !== undefined) {
+        const bytes = Uint8Array.from(atob(relay.binary), c => c.charCodeAt(0));
+        postToPython({type: "message", data: bytes.buffer});
+    } else {
+        postToPython(relay);
+    }
+});
+
+window.addEventListener("message", (event) => {
+    if (event.source !== window || !event.data || event.data.source !== TO_RELAY) {
+        return;
+    }
+    if (event.data.type === "ready") {
+        // Python just attached its listeners: tell it whether the relay is connected
+        chrome.runtime.sendMessage({type: "status"}).then(
+            ({open}) => postToPython({type: open ? "open" : "close"})
+        );
+    } else if (event.data.type === "send") {
+        chrome.runtime.sendMessage({type: "send", data: event.data.data});
+    }
+});
+
+function bootRuntime() {
+    if (runtimeBooted) {
+        return;
+    }
+    runtimeBooted = true;
 
     // --- Load PyScript runtime CSS ---
     const css = document.createElement('link');
@@ -19,38 +131,111 @@ function injectWhenReady() {
 
     // Wait until PyScript runtime is loaded before injecting Python code
     pyscriptJs.onload = async () => {
-        // --- Load main.py ---
-        const mainCode = await fetch(chrome.runtime.getURL('main.py')).then(r => r.text());
-
-        // --- Load all utils/*.py files (helper modules) ---
-        const utilsFiles = [
-            "__init__.py",
-            "easter_eggs.py",
-            "fake_cursor.py",
-            "make_highlights.py",
-            "move_and_click.py",
-            "toast.py"
-            // Add more utils/*.py files here if needed
-        ];
-
-        // Create Python code to build utils/ directory at runtime
-        let utilsLoader = `
+        // --- Prefer the prebuilt bundle (python browser_extension/build_bundle.py) ---
+        // One zip imported with zipimport, instead of embedding every file in a Python string
+        const useBundle = await bundleIsCurrent();
+
+        // (PyScript tag runs Python code directly in the browser)
+        const pyTag = document.createElement('py-script');
+        pyTag.textContent = useBundle
+            ? bundleLoader(chrome.runtime.getURL(BUNDLE_PATH))
+            : sourceLoader(await fetchSources());
+        document.body.appendChild(pyTag);
+    };
+}
+
+// [path, code] of main.py and every utils/*.py file, in the order build_bundle.py packs them
+async function fetchSources() {
+    const paths = ["main.py", ...UTILS_FILES.map(f => `utils/${f}`).sort()];
+    const codes = await Promise.all(paths.map(path => fetch(chrome.runtime.getURL(path)).then(r => r.text())));
+    return paths.map((path, i) => [path, codes[i]]);
+}
+
+// FNV-1a (32 bit) of the sources, as computed by source_digest() in build_bundle.py
+function sourceDigest(sources) {
+    const encoder = new TextEncoder();
+    let hash = 0x811c9dc5;
+    for (const [path, code] of sources) {
+        for (const byte of encoder.encode(`${path}\0${code}\0`)) {
+            hash = Math.imul(hash ^ byte, 0x01000193) >>> 0;
+        }
+    }
+    return hash.toString(16).padStart(8, "0");
+}
+
+// Whether the bundle was built from the current sources; a stale one is ignored with a warning,
+// so editing utils/*.py after `make bundle` never keeps running the old code. Only the first
+// boot after the extension is (re)loaded or the bundle rebuilt fetches and hashes the sources;
+// later boots read the stored verdict for the bundle's digest
+async function bundleIsCurrent() {
+    const response = await fetch(chrome.runtime.getURL(BUNDLE_DIGEST_PATH)).catch(() => null);
+    if (!response || !response.ok) {
+        return false;
+    }
+    const digest = (await response.text()).trim();
+    const {[BUNDLE_CHECK_KEY]: check} = await chrome.storage.local.get(BUNDLE_CHECK_KEY);
+    let current;
+    if (check && check.digest === digest) {
+        current = check.current;
+    } else {
+        current = digest === sourceDigest(await fetchSources());
+        await chrome.storage.local.set({[BUNDLE_CHECK_KEY]: {digest, current}});
+    }
+    if (!current) {
+        console.warn("Misclick: bundle/misclick.zip is older than the Python sources, loading the sources instead. Run `make bundle` to rebuild it.");
+    }
+    return current;
+}
+
+// Python that writes every utils/*.py file to the in-browser FS and then runs main.py
+// Used when the extension was loaded without building the bundle, or the bundle is stale
+function sourceLoader(sources) {
+    // Create Python code to build utils/ directory at runtime
+    let utilsLoader = `
 import os
 os.makedirs("utils", exist_ok=True)
 `;
+    let mainCode = "";
 
-        // For each Python util file, write its contents into the in-browser FS
-        for (const f of utilsFiles) {
-            const code = await fetch(chrome.runtime.getURL(`utils/${f}`)).then(r => r.text());
-            utilsLoader += `with open("utils/${f}", "w") as fp:\n    fp.write("""${code.replace(/"""/g, '\\"""')}""")\n\n`;
+    // For each Python util file, write its contents into the in-browser FS
+    // Backslashes are escaped first, so escapes in the source ("\n" in a string) survive
+    // being embedded in a non-raw string literal, then triple quotes are escaped
+    for (const [path, code] of sources) {
+        if (path === "main.py") {
+            mainCode = code;
+            continue;
         }
+        const escaped = code.replace(/\\/g, '\\\\').replace(/"""/g, '\\"""');
+        utilsLoader += `with open("${path}", "w") as fp:\n    fp.write("""${escaped}""")\n\n`;
+    }
 
-        // --- Inject everything into <py-script> ---
-        // (PyScript tag runs Python code directly in the browser)
-        const pyTag = document.createElement('py-script');
-        pyTag.textContent = utilsLoader + "\n\n" + mainCode;
-        document.body.appendChild(pyTag);
-    };
+    return utilsLoader + "\n\n" + mainCode;
+}
+
+// Python that fetches the prebuilt bundle, mounts it on sys.path and runs main.py from it
+function bundleLoader(bundleUrl) {
+    return `
+import sys
+from pyodide.http import pyfetch
+
+response = await pyfetch("${bundleUrl}")
+with open("/misclick.zip", "wb") as fp:
+    fp.write(await response.bytes())
+sys.path.insert(0, "/misclick.zip")
+import main
+`;
+}
+
+function injectWhenReady() {
+    // Ensure the DOM is ready before injecting anything
+    if (!document.head || !document.body) {
+        requestAnimationFrame(injectWhenReady);
+        return;
+    }
+
+    if (!LAZY_RUNTIME_BOOT) {
+        bootRuntime();
+    }
 
     // --- Easter eggs loader ---
     // Fetch JSON file with video links and create invisible <a> elements on screen
@@ -1,24 +1,37 @@
 import json
 import random
+import time
 import traceback
 
 # JS objects and APIs exposed to Pyodide
-from js import WebSocket
-from js import console
 from js import document
 from js import window
-from pyodide.ffi import create_proxy
 
 # Local utility imports
+from utils import DEBUG
+from utils import PROXIES
+from utils import ClickTargets
+from utils import ClockSync
+from utils import LatencyOverlay
+from utils import Logger
+from utils import RelayBridge
+from utils import CursorState
 from utils import create_fake_cursor
+from utils import decode_gestures
 from utils import fetch_easter_eggs
+from utils import find_clickable
 from utils import get_and_highlight_text_in_rect
 from utils import move_and_maybe_click
 from utils import show_toast
 from utils import trigger_click
 
-# Connect to backend WebSocket server (browser <-> Python extension bridge)
-ws = WebSocket.new("ws://localhost:8000/ws")
+# Connection to the backend WebSocket server, shared by all tabs
+# The socket itself lives in the extension's background worker (background.js), which
+# negotiates binary gesture frames and forwards the phone's frames to the active tab
+ws = RelayBridge()
+
+# Logger for the extension; per-event messages are DEBUG and skipped unless enabled
+log = Logger("misclick")
 
 # Browser/environment metadata
 BROWSER_HEIGHT = window.innerHeight
@@ -26,25 +39,53 @@ BROWSER_WIDTH = window.innerWidth
 EASTER_EGGS_COORDINATES = fetch_easter_eggs()  # pre-scanned Easter egg anchor points
 
 # State & timers
-INACTIVITY_TIMER = None
+LAST_ACTIVITY = None  # time.monotonic() of the last message; None once wandering was triggered for it
 WANDERING = False
-WANDERING_PROXY = None
 LAST_X = None
 LAST_Y = None
 LAST_CLICK = 0
 LAST_SCROLL_VALUE = None
 NEXT_SCROLL_VALUE = 0
+WANDER_STEPS = 0  # wander steps taken, compared with WANDER_CLICKS as the click hit rate
+WANDER_CLICKS = 0
+CLICK_TARGETS = ClickTargets()  # clickable elements wander mode aims at
 
 # Behavior constants
 WANDERING_STEP_X = 100
 WANDERING_STEP_Y = 100
 WANDERING_STEP_TIME = 500  # ms between cursor hops
 INACTIVITY_TIME = 30000  # 1 minute idle → wander mode kicks in
+INACTIVITY_CHECK_INTERVAL = 1000  # ms between idle checks
 WANDERING_TIME_MAX_LIMIT = 60000  # wander lasts max 60s
 WANDERING_TIME_MIN_LIMIT = 10000  # wander lasts min 10s
 PROBABILITY_FOR_EASTER_EGG = 0.3  # 10% chance to snap to Easter egg location
 PROBABILITY_FOR_SHADOW_MODE = 0.3  # 30% chance of toggling cursor visibility
 
+# Copied text longer than this (characters) is sent in several 'copied_text_chunk' frames.
+# Frames are encoded with ensure_ascii=False, so a character takes at most 6 bytes (a
+# \uXXXX-escaped control character; 4-byte UTF-8 otherwise), keeping every frame below
+# the relay's MAX_FRAME_BYTES (64 KiB). With the default ASCII escaping an emoji would
+# take 12 bytes and a chunk of them would get the shared socket closed with 1009
+COPIED_TEXT_CHUNK_SIZE = 8000
+
+# Milliseconds between console reports of cursor frames rendered vs. messages received
+RENDER_STATS_INTERVAL = 10000
+
+# WebSocket messages received so far, compared against cursor frames rendered
+MESSAGES_RECEIVED = 0
+
+# Id of the last chunked copy, so the phone can discard chunks of an older one
+COPIED_TEXT_ID = 0
+
+# Milliseconds between clock-sync pings to the relay, which latency traces are timed against
+CLOCK_SYNC_INTERVAL = 5000
+
+# Offset of this page's clock to the relay's
+clock = ClockSync()
+
+# Per-stage latency of traced gestures, drawn in the page when logging at DEBUG level
+LATENCY_OVERLAY = LatencyOverlay() if log.enabled_for(DEBUG) else None
+
 
 def random_mode(modes: list):
     """Pick a random subset of modes to activate."""
@@ -61,13 +102,14 @@ def start_wandering():
       - 'wandering': random movement
       - 'rage': exaggerated fast jumps
       - 'shadow': cursor flickers (visible/hidden)
-    It may also click on clickable elements or snap to Easter egg positions.
+    Steps aim at clickable elements from a snapshot (CLICK_TARGETS) when any are visible,
+    and click them, or snap to Easter egg positions.
     """
-    global WANDERING, WANDERING_PROXY
+    global WANDERING
     if WANDERING:
         return  # already running
     WANDERING = True
-    console.log("⚠️ No WebSocket messages — starting wandering mode")
+    log.info("⚠️ No WebSocket messages — starting wandering mode")
 
     # Randomize which "flavors" of wandering get activated
     modes = ["wandering", "rage", "shadow"]
@@ -79,9 +121,16 @@ def start_wandering():
         if not WANDERING:
             return  # stop if wandering was canceled
 
-        # Pick a random new location within screen bounds
-        x = random.randint(0, BROWSER_WIDTH - 50)
-        y = random.randint(0, BROWSER_HEIGHT - 50)
+        global WANDER_STEPS, WANDER_CLICKS
+        WANDER_STEPS += 1
+
+        # Aim at a visible clickable element, or pick a random location within screen bounds
+        target = CLICK_TARGETS.sample()
+        if target:
+            x, y = target
+        else:
+            x = random.randint(0, BROWSER_WIDTH - 50)
+            y = random.randint(0, BROWSER_HEIGHT - 50)
 
         # Occasionally snap to an Easter egg anchor
         if EASTER_EGGS_COORDINATES and random.random() < PROBABILITY_FOR_EASTER_EGG:
@@ -91,104 +140,104 @@ def start_wandering():
 
         # Shadow mode: flicker cursor visibility
         if "shadow" in mode and random.random() < PROBABILITY_FOR_SHADOW_MODE:
-            console.log("Shadow enabled")
+            log.debug("Shadow enabled")
             fake_cursor.style.visibility = "visible" if fake_cursor.style.visibility == "hidden" else "hidden"
 
-        # Rage mode: amplify movement distance
-        if "rage" in mode:
-            console.log("Rage enabled")
+        # Rage mode: amplify movement distance (of random jumps; aimed ones keep their target)
+        if "rage" in mode and not target:
+            log.debug("Rage enabled")
             dx *= 2
             dy *= 2
 
         # Move fake cursor
-        fake_cursor.style.left = f"{dx}px"
-        fake_cursor.style.top = f"{dy}px"
+        cursor.move_to(dx, dy)
 
-        # Try clicking element under cursor (if clickable)
-        el = document.elementFromPoint(dx, dy)
+        # Try clicking element under cursor (if it or an ancestor is clickable)
+        el = find_clickable(document.elementFromPoint(dx, dy))
         if el:
-            tag = el.tagName.lower()
-            clickable = (
-                tag in ["button", "a", "input", "select"]
-                or el.onclick
-                or window.getComputedStyle(el).cursor == "pointer"
-            )
-            if clickable:
-                console.log("Clicking:", el)
-                trigger_click(el)
+            log.debug("Clicking: %s", el)
+            trigger_click(el)
+            WANDER_CLICKS += 1
 
         # Schedule next step
-        window.setTimeout(WANDERING_PROXY, WANDERING_STEP_TIME)
+        window.setTimeout(PROXIES.once(wander_step), WANDERING_STEP_TIME)
+
+    # Snapshot the clickable elements to aim at while wandering
+    CLICK_TARGETS.start()
 
-    # Wrap wander_step for JS callbacks
-    WANDERING_PROXY = create_proxy(wander_step)
     wander_step()  # kick it off immediately
 
     def stop_wandering():
         """Stop wandering after timeout."""
         global WANDERING
         WANDERING = False
+        CLICK_TARGETS.stop()
         fake_cursor.style.visibility = "visible"  # reset cursor visibility
-        console.log("✅ Wandering mode ended — control back to user")
+        log.info("✅ Wandering mode ended — control back to user")
+        log.debug("Wander steps: %d, steps that clicked: %d", WANDER_STEPS, WANDER_CLICKS)
 
     # Stop wandering after a random duration (10–60s)
     duration = random.randint(WANDERING_TIME_MIN_LIMIT, WANDERING_TIME_MAX_LIMIT)
-    window.setTimeout(create_proxy(stop_wandering), duration)
+    window.setTimeout(PROXIES.once(stop_wandering), duration)
     fake_cursor.style.visibility = "visible"
 
 
-def reset_inactivity_timer():
-    """Reset inactivity countdown — triggers wandering mode after idle time."""
-    global INACTIVITY_TIMER
-    if INACTIVITY_TIMER is not None:
-        window.clearTimeout(INACTIVITY_TIMER)
+def record_activity():
+    """Note user activity; called for every message, so it only stores a timestamp."""
+    global LAST_ACTIVITY
+    LAST_ACTIVITY = time.monotonic()
 
-    def on_timeout(*args):
-        start_wandering()
 
-    INACTIVITY_TIMER = window.setTimeout(create_proxy(on_timeout), INACTIVITY_TIME)
-    console.log("finished_all")  # debug marker
+def check_inactivity():
+    """
+    Periodic idle check — triggers wandering mode once per idle period of INACTIVITY_TIME.
+    Replaces re-arming a timeout on every message.
+    """
+    global LAST_ACTIVITY
+    if LAST_ACTIVITY is not None and (time.monotonic() - LAST_ACTIVITY) * 1000 >= INACTIVITY_TIME:
+        LAST_ACTIVITY = None  # wait for new activity before wandering again
+        start_wandering()
 
 
 def send_text(text: str):
-    """Send highlighted/copied text to the server over WebSocket."""
-    console.log("Sending copied text")
-    ws.send(json.dumps({"copied_text": text}))
-
-
-def drag_and_copy(cursor, offset_x, offset_y):  # noqa: ARG001
+    """
+    Send highlighted/copied text to the server over WebSocket.
+    Long selections are split into COPIED_TEXT_CHUNK_SIZE pieces that the phone reassembles.
+    """
+    global COPIED_TEXT_ID
+    log.debug("Sending copied text")
+    if len(text) <= COPIED_TEXT_CHUNK_SIZE:
+        ws.send(json.dumps({"copied_text": text}, ensure_ascii=False))
+        return
+    COPIED_TEXT_ID += 1
+    pieces = [text[i : i + COPIED_TEXT_CHUNK_SIZE] for i in range(0, len(text), COPIED_TEXT_CHUNK_SIZE)]
+    for index, piece in enumerate(pieces):
+        chunk = {"copied_text_chunk": piece, "id": COPIED_TEXT_ID, "index": index, "total": len(pieces)}
+        ws.send(json.dumps(chunk, ensure_ascii=False))
+
+
+def drag_and_copy(cursor, offset_x, offset_y):
     """
     Drag the fake cursor, highlight text along the drag rectangle, and send it.
     """
     # Current cursor coordinates
-    current_x = float(cursor.style.left.replace("px", "") or 0)
-    current_y = float(cursor.style.top.replace("px", "") or 0)
-
-    # Apply movement offsets
-    new_x = current_x + offset_x
-    new_y = current_y + offset_y
+    current_x, current_y = cursor.x, cursor.y
 
-    # Clamp inside screen
-    max_x = window.innerWidth - cursor.offsetWidth
-    max_y = window.innerHeight - cursor.offsetHeight
-    new_x = max(0, min(new_x, max_x))
-    new_y = max(0, min(new_y, max_y))
-
-    # Update fake cursor position
-    cursor.style.left = f"{new_x}px"
-    cursor.style.top = f"{new_y}px"
+    # Apply movement offsets, clamped inside the screen
+    new_x, new_y = cursor.move_by(offset_x, offset_y)
 
     # Highlight & copy text inside drag rectangle
     text = get_and_highlight_text_in_rect(current_x, current_y, new_x, new_y)
     send_text(text)
 
-    console.log(new_x, new_y)
+    log.debug("Dragged to %s %s", new_x, new_y)
 
 
 def fetch_coordinates(data_x: float, data_y: float, fingers: int, data_type: str, click: int):
     """
     Handle new coordinate data from the WebSocket (touch/mouse gestures).
-    Decides whether to move, click, drag, or scroll.
+    Decides whether to move, click, drag, or scroll. 'move' frames are deltas streamed
+    while the finger is still moving and are applied incrementally.
     """
     global LAST_X, LAST_Y, LAST_CLICK, NEXT_SCROLL_VALUE, LAST_SCROLL_VALUE
 
@@ -197,32 +246,87 @@ def fetch_coordinates(data_x: float, data_y: float, fingers: int, data_type: str
     data_y = data_y * BROWSER_HEIGHT
 
     try:
-        console.log("New Data", data_x, data_y, fingers, data_type, click)
+        log.debug("New Data %s %s %s %s %s", data_x, data_y, fingers, data_type, click)
         if isinstance(data_x, (int, float)) and isinstance(data_y, (int, float)):
             if fingers == 1:
                 # Single-finger gestures
-                if data_type in {"scroll", "touch"} and (data_x != LAST_X or data_y != LAST_Y or click != LAST_CLICK):
-                    move_and_maybe_click(fake_cursor, -data_x, -data_y, bool(click))
+                if data_type == "move":
+                    # Streamed deltas are applied as they arrive; repeated identical deltas are expected
+                    move_and_maybe_click(cursor, -data_x, -data_y, False)
+
+                elif data_type in {"scroll", "touch"} and (
+                    data_x != LAST_X or data_y != LAST_Y or click != LAST_CLICK
+                ):
+                    move_and_maybe_click(cursor, -data_x, -data_y, bool(click))
                     LAST_X, LAST_Y, LAST_CLICK = data_x, data_y, click
 
                 elif data_type == "drag" and (data_x != LAST_X or data_y != LAST_Y or click != LAST_CLICK):
-                    drag_and_copy(fake_cursor, data_x, data_y)
-                    console.log(f"from [{LAST_X},{LAST_Y}] to [{data_x},{data_y}]")
+                    drag_and_copy(cursor, data_x, data_y)
+                    log.debug("from [%s,%s] to [%s,%s]", LAST_X, LAST_Y, data_x, data_y)
                     LAST_X, LAST_Y, LAST_CLICK = data_x, data_y, click
             else:
                 # Multi-finger gestures → scrolling
                 if data_y != 0:
                     NEXT_SCROLL_VALUE = window.scrollY + data_y
-                    console.log(f"scroll to {NEXT_SCROLL_VALUE}")
+                    log.debug("scroll to %s", NEXT_SCROLL_VALUE)
                     window.scrollTo(0, NEXT_SCROLL_VALUE)
 
     except Exception as err:
-        console.error("Error fetching coordinates:", str(err))
-        console.error(traceback.format_exc())
+        log.error("Error fetching coordinates: %s\n%s", err, traceback.format_exc())
+
+
+def apply_batch(gestures: list):
+    """
+    Apply a batch of gestures sent together by the phone, with as few DOM updates as possible.
+
+    Consecutive 'move' deltas with the same finger count are summed and applied as one move;
+    every other gesture is applied in order, as if it had arrived on its own.
+    """
+    merged = []
+    for gesture in gestures:
+        last = merged[-1] if merged else None
+        if last and gesture["type"] == last["type"] == "move" and gesture["fingers"] == last["fingers"]:
+            last["x"] += gesture["x"]
+            last["y"] += gesture["y"]
+        else:
+            merged.append(dict(gesture))
+
+    for gesture in merged:
+        fetch_coordinates(gesture["x"], gesture["y"], gesture["fingers"], gesture["type"], gesture["click"])
 
 
 # Start idle tracking immediately
-reset_inactivity_timer()
+record_activity()
+window.setInterval(PROXIES.proxy(check_inactivity), INACTIVITY_CHECK_INTERVAL)
+
+
+def sync_clock():
+    """Ping the relay to refresh the clock offset used to time latency traces."""
+    ws.send(clock.ping())
+
+
+def finish_trace(trace: dict, received: float):
+    """
+    Complete the timestamps of a traced gesture that was just applied, once it is painted.
+
+    The trace is reported to the relay, which keeps per-stage histograms for /metrics, and
+    drawn in the latency overlay when it is enabled.
+    """
+    trace["receive"] = received
+    trace["apply"] = clock.now()
+
+    def painted():
+        trace["paint"] = clock.now()
+        ws.send(json.dumps({"type": "trace_report", "trace": trace}))
+        if LATENCY_OVERLAY is not None:
+            LATENCY_OVERLAY.record(trace)
+
+    def frame_started(timestamp):  # noqa: ARG001
+        # Animation frame callbacks run before style, layout and paint; a task queued from one
+        # runs after the browser has rendered that frame, which is when "paint" is taken
+        window.setTimeout(PROXIES.once(painted), 0)
+
+    window.requestAnimationFrame(PROXIES.once(frame_started))
 
 
 # WebSocket event handlers
@@ -230,30 +334,64 @@ def onopen(event):  # noqa: ARG001
     """
     When connection is established
     """
-    console.log("✅ Connection opened from extension")
+    log.info("✅ Connection opened from extension")
+    sync_clock()
 
 
 def onmessage(event):  # noqa: ARG001
     """
-    When message is received
+    When message is received, either as JSON text or as binary gesture frames.
+    A JSON array or several binary frames in one message form a batch. JSON gestures
+    sampled for latency tracing carry a "trace" object, completed by finish_trace.
     """
-    data = json.loads(event.data)
-    console.log("Received coordinates", data)
-    reset_inactivity_timer()  # reset idle timer on activity
-    fetch_coordinates(data["x"], data["y"], data["fingers"], data["type"], data["click"])
+    global MESSAGES_RECEIVED
+    received = None
+    if isinstance(event.data, str):
+        data = json.loads(event.data)
+        if isinstance(data, dict) and data.get("type") == "pong":
+            clock.on_pong(data)
+            return
+        if isinstance(data, dict) and "trace" in data:
+            received = clock.now()
+    else:
+        data = decode_gestures(event.data.to_bytes())
+    MESSAGES_RECEIVED += 1
+    log.debug("Received coordinates %s", data)
+    record_activity()  # reset idle timer on activity
+    if isinstance(data, list):
+        apply_batch(data)
+    else:
+        fetch_coordinates(data["x"], data["y"], data["fingers"], data["type"], data["click"])
+        if received is not None:
+            finish_trace(data["trace"], received)
+
+
+def report_render_stats():
+    """Log how many cursor frames were drawn for the messages received, and live proxies (debug aid)."""
+    log.debug(
+        "Cursor: %d frames rendered for %d messages and %d moves received; %d live proxies",
+        cursor.frames_rendered,
+        MESSAGES_RECEIVED,
+        cursor.moves,
+        PROXIES.live,
+    )
 
 
 def onclose(event):  # noqa: ARG001
     """
     When connection is closed
     """
-    console.log("❌ Connection closed")
+    log.info("❌ Connection closed")
 
 
-# Initialize fake cursor element
+# Initialize fake cursor element and the Python-side state that owns its position
 fake_cursor = create_fake_cursor()
-
-# Attach WebSocket event listeners
-ws.addEventListener("open", create_proxy(onopen))
-ws.addEventListener("message", create_proxy(onmessage))
-ws.addEventListener("close", create_proxy(onclose))
+cursor = CursorState(fake_cursor)
+window.setInterval(PROXIES.proxy(report_render_stats), RENDER_STATS_INTERVAL)
+window.setInterval(PROXIES.proxy(sync_clock), CLOCK_SYNC_INTERVAL)
+
+# Attach WebSocket event listeners (plain Python callables: the bridge calls them from Python)
+ws.addEventListener("open", onopen)
+ws.addEventListener("message", onmessage)
+ws.addEventListener("close", onclose)
+ws.connect()
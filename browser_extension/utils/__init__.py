@@ -1,17 +1,41 @@
+from .click_targets import ClickTargets
+from .clock_sync import ClockSync
+from .cursor_state import CursorState
 from .easter_eggs import fetch_easter_eggs
 from .fake_cursor import create_fake_cursor
+from .latency_overlay import LatencyOverlay
+from .logger import DEBUG
+from .logger import Logger
 from .make_highlights import get_and_highlight_text_in_rect
+from .move_and_click import find_clickable
 from .move_and_click import move_and_maybe_click
 from .move_and_click import trigger_click
+from .proxies import PROXIES
+from .relay_bridge import RelayBridge
 from .toast import create_toast
 from .toast import show_toast
+from .wire import BINARY_SUBPROTOCOL
+from .wire import decode_gesture
+from .wire import decode_gestures
 
 __all__ = [
+    "ClickTargets",
+    "ClockSync",
+    "CursorState",
     "fetch_easter_eggs",
     "create_fake_cursor",
     "get_and_highlight_text_in_rect",
+    "LatencyOverlay",
+    "DEBUG",
+    "Logger",
+    "find_clickable",
     "move_and_maybe_click",
     "trigger_click",
     "create_toast",
     "show_toast",
+    "RelayBridge",
+    "PROXIES",
+    "BINARY_SUBPROTOCOL",
+    "decode_gesture",
+    "decode_gestures",
 ]
@@ -0,0 +1,128 @@
+import random
+
+from js import Object
+from js import document
+from js import window
+from pyodide.ffi import to_js
+
+from .make_highlights import is_own_node
+from .proxies import PROXIES
+
+# Elements wander mode aims at; `cursor: pointer` elements cannot be selected and are
+# only clicked when a random position happens to land on them
+CLICKABLE_SELECTOR = "a[href], button, input, select, [onclick], [role='button']"
+
+
+class ClickTargets:
+    """
+    Snapshot of the clickable elements on the page, for wander mode to aim at.
+
+    Instead of hit-testing random pixels, wander mode samples a position inside one of
+    these elements. The snapshot is taken when wander mode starts, with rectangles in
+    document coordinates so window scrolling keeps them valid, and kept current
+    incrementally while it runs: added elements are measured and appended, removed ones
+    are dropped, and a resize or a scroll inside an inner element triggers a full rebuild
+    on the next sample.
+
+    Attributes:
+        targets (list[tuple]): (element, (left, top, right, bottom)) in document coordinates.
+    """
+
+    def __init__(self):
+        self.targets = []
+        self.stale = True
+        self.observer = None
+        self._proxies = {}
+
+    def _measure(self, el):
+        """Append `el` to the targets if it has a visible box."""
+        r = el.getBoundingClientRect()
+        if r.width > 0 and r.height > 0:
+            scroll_x = window.scrollX
+            scroll_y = window.scrollY
+            self.targets.append((el, (r.left + scroll_x, r.top + scroll_y, r.right + scroll_x, r.bottom + scroll_y)))
+
+    def rebuild(self):
+        """Measure every clickable element on the page."""
+        self.targets = []
+        for el in document.querySelectorAll(CLICKABLE_SELECTOR):
+            if not is_own_node(el):
+                self._measure(el)
+        self.stale = False
+
+    def _on_mutations(self, records, observer):  # noqa: ARG002
+        """MutationObserver callback: measure added clickable elements, forget removed ones."""
+        removed = False
+        for record in records:
+            if is_own_node(record.target):
+                continue
+            for node in record.addedNodes:
+                if node.nodeType != window.Node.ELEMENT_NODE or is_own_node(node):
+                    continue
+                if node.matches(CLICKABLE_SELECTOR):
+                    self._measure(node)
+                for el in node.querySelectorAll(CLICKABLE_SELECTOR):
+                    self._measure(el)
+            removed = removed or record.removedNodes.length > 0
+        if removed:
+            self.targets = [(el, rect) for el, rect in self.targets if el.isConnected]
+
+    def _on_scroll(self, event):
+        """Scroll listener: window scrolls keep document coordinates valid, inner scrolls do not."""
+        if event.target != document and event.target != document.documentElement:
+            self.stale = True
+
+    def _on_resize(self, *args):  # noqa: ARG002
+        """Resize listener: the layout changed, so every rectangle may be wrong."""
+        self.stale = True
+
+    def start(self):
+        """Take a fresh snapshot and keep it current until `stop` is called."""
+        if not self._proxies:
+            self._proxies = {
+                "mutations": PROXIES.proxy(self._on_mutations),
+                "scroll": PROXIES.proxy(self._on_scroll),
+                "resize": PROXIES.proxy(self._on_resize),
+            }
+            self.observer = window.MutationObserver.new(self._proxies["mutations"])
+        self.rebuild()
+        options = {"childList": True, "subtree": True}
+        self.observer.observe(document.body, to_js(options, dict_converter=Object.fromEntries))
+        document.addEventListener("scroll", self._proxies["scroll"], True)
+        window.addEventListener("resize", self._proxies["resize"])
+
+    def stop(self):
+        """Stop tracking changes and release the snapshot."""
+        if self.observer is not None:
+            self.observer.disconnect()
+            document.removeEventListener("scroll", self._proxies["scroll"], True)
+            window.removeEventListener("resize", self._proxies["resize"])
+        self.targets = []
+        self.stale = True
+
+    def sample(self):
+        """
+        Pick a random position inside a clickable element currently in the viewport.
+
+        Returns:
+            tuple[float, float] | None: (x, y) in viewport coordinates, or None if no
+            clickable element is visible.
+        """
+        if self.stale:
+            self.rebuild()
+        scroll_x = window.scrollX
+        scroll_y = window.scrollY
+        width = window.innerWidth
+        height = window.innerHeight
+        visible = []
+        for _, (left, top, right, bottom) in self.targets:
+            left = max(left - scroll_x, 0)
+            top = max(top - scroll_y, 0)
+            right = min(right - scroll_x, width - 1)
+            bottom = min(bottom - scroll_y, height - 1)
+            if left < right and top < bottom:
+                visible.append((left, top, right, bottom))
+        if not visible:
+            return None
+        left, top, right, bottom = random.choice(visible)
+        return random.uniform(left, right), random.uniform(top, bottom)
@@ -0,0 +1,82 @@
+import json
+
+from js import performance
+
+# Pong replies kept to estimate the offset; the one with the shortest round trip wins
+CLOCK_SYNC_SAMPLES = 8
+
+
+def local_ms():
+    """
+    High-resolution wall-clock time of this page.
+
+    Returns:
+        float: Milliseconds since the Unix epoch, with sub-millisecond resolution.
+    """
+    return performance.timeOrigin + performance.now()
+
+
+class ClockSync:
+    """
+    Offset between this page's clock and the relay's, estimated from ping/pong frames.
+
+    Latency traces cross three devices, so every timestamp in them is converted to the
+    relay's clock. A ping carries the local send time and the relay answers with its own
+    time; assuming the request and the reply took equally long, the relay's clock read
+    `relay` halfway through the round trip. The sample with the shortest round trip has
+    the least room for asymmetry, so its offset is used.
+
+    Attributes:
+        offset (float | None): Relay clock minus local clock in ms, None until the first pong.
+        rtt (float | None): Round trip of the sample the offset comes from, in ms.
+    """
+
+    __slots__ = ("offset", "rtt", "samples")
+
+    def __init__(self):
+        self.offset = None
+        self.rtt = None
+        self.samples = []
+
+    def ping(self):
+        """
+        Build a ping frame for the relay.
+
+        Returns:
+            str: The JSON frame to send.
+        """
+        return json.dumps({"type": "ping", "t": local_ms()})
+
+    def on_pong(self, data):
+        """
+        Update the offset from a pong frame.
+
+        Args:
+            data (dict): The decoded frame, with the ping's "t" and the relay's "relay" time.
+        """
+        received = local_ms()
+        rtt = received - data["t"]
+        self.samples = [*self.samples[-(CLOCK_SYNC_SAMPLES - 1) :], (rtt, data["relay"] - (data["t"] + received) / 2)]
+        self.rtt, self.offset = min(self.samples)
+
+    def now(self):
+        """
+        Current time in the relay's clock.
+
+        Returns:
+            float | None: Milliseconds since the Unix epoch, None while the offset is unknown.
+        """
+        return None if self.offset is None else local_ms() + self.offset
+
+    def to_relay(self, timestamp):
+        """
+        Convert a timestamp of this page's `performance.now()` clock (e.g. an event's
+        `timeStamp`) to the relay's clock.
+
+        Args:
+            timestamp (float): Milliseconds since the page's time origin.
+
+        Returns:
+            float | None: The same instant in the relay's clock, None while the offset is unknown.
+        """
+        return None if self.offset is None else performance.timeOrigin + timestamp + self.offset
@@ -0,0 +1,134 @@
+from js import window
+
+from .proxies import PROXIES
+
+# Fraction of the remaining distance the drawn cursor covers per animation frame, to glide
+# between sparse position samples; 0 jumps straight to the latest position
+CURSOR_SMOOTHING = 0
+
+# Distance (px) below which an interpolating cursor snaps to its target
+CURSOR_SNAP_DISTANCE = 0.5
+
+
+class CursorState:
+    """
+    Position of the fake cursor, owned by Python.
+
+    Reading the position back from `style.left`/`style.top` and the bounds from
+    `offsetWidth`/`innerWidth` on every event crosses the Pyodide FFI several times and
+    forces layout. Instead the position lives here, the viewport and cursor dimensions are
+    cached and only re-read on resize, and the position is written to the DOM as a single
+    `transform: translate()` assignment, which the browser can apply without layout.
+
+    Moves only update the position in Python; the DOM is written from a requestAnimationFrame
+    callback, at most once per frame however many moves arrived in between, so updates
+    line up with the display's refresh. `x`/`y` are always the latest position (used for
+    clicks and drags), while the drawn position may lag by up to one frame, or glide
+    towards it when `smoothing` is set.
+
+    Args:
+        element (js.Element): The fake cursor element, positioned at left/top 0.
+        smoothing (float, optional): Interpolation factor per frame, 0 to disable.
+            Defaults to CURSOR_SMOOTHING.
+
+    Attributes:
+        moves (int): Position updates requested so far.
+        frames_rendered (int): Animation frames that wrote the position to the DOM.
+    """
+
+    __slots__ = (
+        "element",
+        "style",
+        "x",
+        "y",
+        "drawn_x",
+        "drawn_y",
+        "width",
+        "height",
+        "viewport_width",
+        "viewport_height",
+        "smoothing",
+        "frame_pending",
+        "moves",
+        "frames_rendered",
+        "_frame_proxy",
+        "_resize_proxy",
+    )
+
+    def __init__(self, element, smoothing=CURSOR_SMOOTHING):
+        self.element = element
+        self.style = element.style
+        self.x = 0.0
+        self.y = 0.0
+        self.drawn_x = 0.0
+        self.drawn_y = 0.0
+        self.width = 0
+        self.height = 0
+        self.viewport_width = 0
+        self.viewport_height = 0
+        self.smoothing = smoothing
+        self.frame_pending = False
+        self.moves = 0
+        self.frames_rendered = 0
+        self._frame_proxy = PROXIES.proxy(self._render_frame)
+        self.refresh()
+        self._resize_proxy = PROXIES.proxy(self.refresh)
+        window.addEventListener("resize", self._resize_proxy)
+
+    def refresh(self, *args):  # noqa: ARG002
+        """Re-read the viewport and cursor dimensions (on start and on every resize)."""
+        self.viewport_width = window.innerWidth
+        self.viewport_height = window.innerHeight
+        self.width = self.element.offsetWidth
+        self.height = self.element.offsetHeight
+
+    def move_by(self, offset_x, offset_y):
+        """
+        Move the cursor by an offset, keeping it inside the viewport.
+
+        Args:
+            offset_x (float): Horizontal offset in pixels.
+            offset_y (float): Vertical offset in pixels.
+
+        Returns:
+            tuple[float, float]: The new (x, y) position.
+        """
+        self.x = max(0, min(self.x + offset_x, self.viewport_width - self.width))
+        self.y = max(0, min(self.y + offset_y, self.viewport_height - self.height))
+        self.render()
+        return self.x, self.y
+
+    def move_to(self, x, y):
+        """
+        Place the cursor at a position, without clamping it to the viewport.
+
+        Args:
+            x (float): Horizontal position in pixels.
+            y (float): Vertical position in pixels.
+        """
+        self.x = x
+        self.y = y
+        self.render()
+
+    def render(self):
+        """Schedule the position to be drawn on the next animation frame (once per frame)."""
+        self.moves += 1
+        if not self.frame_pending:
+            self.frame_pending = True
+            window.requestAnimationFrame(self._frame_proxy)
+
+    def _render_frame(self, timestamp):  # noqa: ARG002
+        """requestAnimationFrame callback: write the position to the DOM as one transform."""
+        self.frame_pending = False
+        if self.smoothing:
+            self.drawn_x += (self.x - self.drawn_x) * self.smoothing
+            self.drawn_y += (self.y - self.drawn_y) * self.smoothing
+            if abs(self.x - self.drawn_x) < CURSOR_SNAP_DISTANCE and abs(self.y - self.drawn_y) < CURSOR_SNAP_DISTANCE:
+                self.drawn_x, self.drawn_y = self.x, self.y
+            else:
+                self.frame_pending = True
+                window.requestAnimationFrame(self._frame_proxy)
+        else:
+            self.drawn_x, self.drawn_y = self.x, self.y
+        self.style.transform = f"translate({self.drawn_x}px, {self.drawn_y}px)"
+        self.frames_rendered += 1
@@ -1,5 +1,8 @@
 from js import document
 
+# CSS custom property holding the cursor image, set by content.js from the image bundled with the extension
+CURSOR_IMAGE_VARIABLE = "--misclick-cursor-image"
+
 
 def create_fake_cursor():
     """
@@ -9,9 +12,12 @@ def create_fake_cursor():
     using a custom image. It replaces the default browser cursor with this fake cursor
     by setting `document.body.style.cursor` to "none".
 
-    The cursor is initialized at the top-left corner of the screen (0,0), with fixed
+    The cursor is anchored at the top-left corner of the screen (0,0) and moved with a
+    CSS transform (see CursorState), with fixed
     dimensions of 70x50 pixels, and rendered above all other elements using a very
-    high z-index.
+    high z-index. Its image comes from the CURSOR_IMAGE_VARIABLE custom property, which
+    content.js points at the copy bundled with the extension, so the cursor paints without
+    any network request and does not depend on the local server being up.
 
     Returns:
         js.Element: The created <div> element representing the fake cursor.
@@ -26,8 +32,11 @@ def create_fake_cursor():
     style.zIndex = 999999
     style.left = "0px"
     style.top = "0px"
+    # The position is applied as a transform by CursorState, on its own compositor layer
+    style.transform = "translate(0px, 0px)"
+    style.willChange = "transform"
     style.backgroundSize = "cover"
-    style.backgroundImage = "url('http://127.0.0.1:8000/resource/static/mouse_pointer.png')"
+    style.backgroundImage = f"var({CURSOR_IMAGE_VARIABLE})"
     document.body.appendChild(cursor)
     document.body.style.cursor = "none"
     return cursor
@@ -0,0 +1,76 @@
+from collections import deque
+
+from js import document
+
+# Latency stages of a traced gesture: (name, trace key it starts at, trace key it ends at)
+# Mirrors LATENCY_STAGES in relay/tracing.py on the server
+LATENCY_STAGES = [
+    ("input", "touch", "send"),
+    ("uplink", "send", "relay_in"),
+    ("relay", "relay_in", "relay_out"),
+    ("downlink", "relay_out", "receive"),
+    ("apply", "receive", "apply"),
+    ("paint", "apply", "paint"),
+    ("total", "touch", "paint"),
+]
+
+# Id of the overlay element, excluded from text lookup and clickability like the cursor
+LATENCY_OVERLAY_ID = "misclick-latency-overlay"
+
+# Traces the overlay's percentiles are computed over, most recent first
+LATENCY_OVERLAY_SAMPLES = 50
+
+
+class LatencyOverlay:
+    """
+    Debug panel in the page's corner with per-stage latency percentiles of traced gestures.
+
+    It shows the same stages the relay exposes as histograms on /metrics, computed over the
+    last LATENCY_OVERLAY_SAMPLES traces, and is redrawn once per trace (about once a second).
+
+    Attributes:
+        samples (dict[str, deque]): Recent latencies in ms, per stage name.
+    """
+
+    def __init__(self):
+        self.samples = {name: deque(maxlen=LATENCY_OVERLAY_SAMPLES) for name, _, _ in LATENCY_STAGES}
+        self.element = None
+
+    def _create(self):
+        """Create the overlay element."""
+        element = document.createElement("pre")
+        element.id = LATENCY_OVERLAY_ID
+        style = element.style
+        style.position = "fixed"
+        style.top = "8px"
+        style.right = "8px"
+        style.margin = "0"
+        style.padding = "6px 8px"
+        style.background = "rgba(0, 0, 0, 0.75)"
+        style.color = "#0f0"
+        style.font = "11px monospace"
+        style.pointerEvents = "none"
+        style.zIndex = 2147483647
+        document.body.appendChild(element)
+        return element
+
+    def record(self, trace):
+        """
+        Add a completed trace and redraw the overlay.
+
+        Args:
+            trace (dict): Timestamps by trace key, in the relay's clock (ms).
+        """
+        for name, start, end in LATENCY_STAGES:
+            if trace.get(start) is not None and trace.get(end) is not None:
+                self.samples[name].append(max(trace[end] - trace[start], 0.0))
+        if self.element is None:
+            self.element = self._create()
+        lines = [f"{'stage':<9}{'p50':>7}{'p95':>7}  ms"]
+        for name, values in self.samples.items():
+            if values:
+                ordered = sorted(values)
+                p50 = ordered[len(ordered) // 2]
+                p95 = ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+                lines.append(f"{name:<9}{p50:>7.1f}{p95:>7.1f}")
+        self.element.textContent = "\n".join(lines)
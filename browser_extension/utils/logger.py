@@ -0,0 +1,87 @@
+from js import console
+from js import window
+
+# Log levels, lowest first
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+# Level above every message: logging becomes a no-op (production mode)
+OFF = 100
+
+# Level names accepted in the LOG_LEVEL_STORAGE_KEY override
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR, "off": OFF}
+
+# Level used unless overridden; per-event messages are DEBUG, so they cost nothing by default
+DEFAULT_LOG_LEVEL = INFO
+
+# localStorage key that overrides the level without rebuilding, e.g. "debug" or "off"
+LOG_LEVEL_STORAGE_KEY = "misclick-log-level"
+
+
+def _stored_level():
+    """Read the level override from localStorage, or None (storage may be unavailable)."""
+    try:
+        name = window.localStorage.getItem(LOG_LEVEL_STORAGE_KEY)
+    except Exception:
+        return None
+    return LEVELS.get(str(name).lower()) if name else None
+
+
+class Logger:
+    """
+    Levelled logger that only crosses into the browser console for enabled messages.
+
+    Every `console.log` call crosses the Pyodide FFI and converts its arguments, and
+    f-string messages are built even when nobody reads them. Messages here take
+    %-style arguments that are only formatted when the level is enabled, so a disabled
+    call costs a comparison. Use `enabled_for` to skip computing expensive arguments.
+
+    Args:
+        name (str): Prefix of every message.
+        level (int, optional): Minimum level logged. Defaults to the localStorage override,
+            else DEFAULT_LOG_LEVEL.
+    """
+
+    __slots__ = ("name", "level")
+
+    def __init__(self, name, level=None):
+        self.name = name
+        self.level = level if level is not None else (_stored_level() or DEFAULT_LOG_LEVEL)
+
+    def enabled_for(self, level):
+        """
+        Tell whether messages of a level are logged.
+
+        Args:
+            level (int): DEBUG, INFO, WARNING or ERROR.
+
+        Returns:
+            bool: True if a message at this level would be written.
+        """
+        return level >= self.level
+
+    def _format(self, message, args):
+        """Prefix the message with the logger name and apply the %-style arguments."""
+        return f"[{self.name}] {message % args if args else message}"
+
+    def debug(self, message, *args):
+        """Log a per-event detail."""
+        if self.level <= DEBUG:
+            console.debug(self._format(message, args))
+
+    def info(self, message, *args):
+        """Log a lifecycle event (connection, mode changes)."""
+        if self.level <= INFO:
+            console.info(self._format(message, args))
+
+    def warning(self, message, *args):
+        """Log something unexpected that the code recovered from."""
+        if self.level <= WARNING:
+            console.warn(self._format(message, args))
+
+    def error(self, message, *args):
+        """Log a failure."""
+        if self.level <= ERROR:
+            console.error(self._format(message, args))
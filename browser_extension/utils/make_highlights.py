@@ -1,36 +1,368 @@
+from js import Object
 from js import document
 from js import window
 from pyodide.ffi import create_proxy
+from pyodide.ffi import to_js
+
+from .latency_overlay import LATENCY_OVERLAY_ID
+from .logger import Logger
+from .proxies import PROXIES
+from .spatial_index import GridIndex
+
+log = Logger("misclick.highlights")
 
 HIGHLIGHT_CLASS = "pyodide-temp-highlight"
 
+# Id of the overlay container all highlight boxes are drawn in
+HIGHLIGHT_LAYER_ID = "misclick-highlights"
+
+# Milliseconds the highlights of a drag stay visible
+HIGHLIGHT_DURATION_MS = 2000
+
+# Highlight boxes kept for reuse once a drag's highlights are hidden; extra ones are removed
+MAX_POOLED_HIGHLIGHTS = 256
+
+# How drag-to-copy finds the text under the dragged rectangle:
+#   "index": measure the whole page once into TEXT_INDEX and query it; fastest on static pages
+#   "cull":  walk the DOM on every drag, skipping subtrees outside the rectangle; never
+#            measures off-screen text, so it suits pages that change constantly
+TEXT_LOOKUP_MODE = "index"
+
+# Ids of elements the extension itself adds to the page; changes to them never move text
+OWN_ELEMENT_IDS = {"fake-cursor", "toast", "pyscript-hidden-easter-eggs", HIGHLIGHT_LAYER_ID, LATENCY_OVERLAY_ID}
+
+
+def is_own_node(node):
+    """
+    Tell whether a DOM node was added by the extension (cursor, toast, highlight boxes).
+
+    Args:
+        node (js.Node): The node to check.
+
+    Returns:
+        bool: True for the extension's own elements.
+    """
+    if node.nodeType != window.Node.ELEMENT_NODE:
+        return False
+    return node.id in OWN_ELEMENT_IDS or node.classList.contains(HIGHLIGHT_CLASS)
+
+
+class TextIndex:
+    """
+    Rectangles of every text node on the page, in a grid for fast rectangle queries.
+
+    Measuring every text node with a Range on each drag is O(page size). Instead the page
+    is measured once, on the first drag, and the rectangles are stored in document
+    coordinates so scrolling the window does not make them stale. The index is dropped and
+    rebuilt on the next drag when the page changes: DOM mutations (other than the
+    extension's own elements), a window resize, or scrolling inside an inner scrollable
+    element.
 
-def _schedule_auto_remove(el, timeout=2000):
+    Notes:
+        - Fixed and sticky elements move relative to the document when the window scrolls,
+          so text inside them may be missed until the next rebuild.
+        - Attribute changes are not observed, since the cursor moves by changing its style.
     """
-    Schedule automatic removal of a DOM element after a given timeout.
 
-    This helper creates a persistent JavaScript callback using Pyodide's
-    `create_proxy`, then registers it with `window.setTimeout`. Once the
-    timeout expires, the element is removed from the DOM and the callback
-    is destroyed to avoid memory leaks.
+    def __init__(self):
+        self.grid = None
+        self.nodes = []
+        self.observer = None
+        self._proxies = []
+
+    def invalidate(self, *args):  # noqa: ARG002
+        """Forget the measured rectangles; they are rebuilt on the next query."""
+        self.grid = None
+        self.nodes = []
+
+    def _on_mutations(self, records, observer):  # noqa: ARG002
+        """MutationObserver callback: invalidate unless only the extension's own elements changed."""
+        for record in records:
+            if is_own_node(record.target):
+                continue
+            changed = list(record.addedNodes) + list(record.removedNodes)
+            if record.type != "childList" or not all(is_own_node(node) for node in changed):
+                self.invalidate()
+                return
+
+    def _on_scroll(self, event):
+        """Scroll listener: window scrolls keep document coordinates valid, inner scrolls do not."""
+        if event.target != document and event.target != document.documentElement:
+            self.invalidate()
+
+    def watch(self):
+        """Start listening for changes that move text (called once, on the first build)."""
+        mutations = PROXIES.proxy(self._on_mutations)
+        resize = PROXIES.proxy(self.invalidate)
+        scroll = PROXIES.proxy(self._on_scroll)
+        self._proxies = [mutations, resize, scroll]
+        self.observer = window.MutationObserver.new(mutations)
+        options = {"childList": True, "characterData": True, "subtree": True}
+        self.observer.observe(document.body, to_js(options, dict_converter=Object.fromEntries))
+        window.addEventListener("resize", resize)
+        # Scroll events do not bubble; capture them to see scrolling in inner elements
+        document.addEventListener("scroll", scroll, True)
+
+    def build(self):
+        """Measure every text node in `document.body` and index its rectangles."""
+        if self.observer is None:
+            self.watch()
+        grid = GridIndex()
+        nodes = []
+        scroll_x = window.scrollX
+        scroll_y = window.scrollY
+        walker = document.createTreeWalker(document.body, window.NodeFilter.SHOW_TEXT, None, False)
+        range_ = document.createRange()
+
+        node = walker.nextNode()
+        while node:
+            range_.selectNodeContents(node)
+            key = len(nodes)
+            for r in range_.getClientRects():
+                grid.insert(key, r.left + scroll_x, r.top + scroll_y, r.right + scroll_x, r.bottom + scroll_y)
+            nodes.append(node)
+            node = walker.nextNode()
+
+        self.grid = grid
+        self.nodes = nodes
+
+    def query(self, left, top, right, bottom):
+        """
+        Find the text nodes intersecting a rectangle given in viewport coordinates.
+
+        Args:
+            left (float): Left edge of the rectangle.
+            top (float): Top edge of the rectangle.
+            right (float): Right edge of the rectangle.
+            bottom (float): Bottom edge of the rectangle.
+
+        Returns:
+            list[tuple[js.Node, tuple]]: Each intersecting node, in document order, with its
+            first intersecting (left, top, right, bottom) rectangle in viewport coordinates.
+        """
+        if self.grid is None:
+            self.build()
+        scroll_x = window.scrollX
+        scroll_y = window.scrollY
+        matches = self.grid.query(left + scroll_x, top + scroll_y, right + scroll_x, bottom + scroll_y)
+        return [
+            (self.nodes[key], (r_left - scroll_x, r_top - scroll_y, r_right - scroll_x, r_bottom - scroll_y))
+            for key, (r_left, r_top, r_right, r_bottom) in matches
+        ]
+
+
+# Shared index of the page's text, built lazily on the first drag
+TEXT_INDEX = TextIndex()
+
+
+# Displays of a parent whose in-flow children are stacked top to bottom (or run in lines);
+# "contents" parents are checked through their own parent on the next step up
+BLOCK_FLOW_DISPLAYS = {"block", "flow-root", "list-item", "inline", "inline-block", "contents"}
+
+
+def _in_block_flow(node):
+    """
+    Whether an element and all its ancestors are stacked in plain block flow.
+
+    Only then does an element that starts below the rectangle mean every later element in
+    document order does too. Children of flex, grid and table containers, floats and
+    multi-column content can sit side by side, so a later element may be higher up in
+    another column. Each step checks the parent's layout, up to and including `<html>`, so
+    a flex or grid `<body>` is caught too.
+    """
+    while node is not None:
+        style = window.getComputedStyle(node)
+        if style.position not in ("static", "relative") or style.cssFloat != "none":
+            return False
+        parent = node.parentElement
+        if parent is None:
+            return True
+        parent_style = window.getComputedStyle(parent)
+        if parent_style.display not in BLOCK_FLOW_DISPLAYS or parent_style.columnCount != "auto":
+            return False
+        node = parent
+    return True
+
+
+def _intersects(r, left, top, right, bottom):
+    """Whether a DOMRect intersects the rectangle (edges touching count)."""
+    return not (r.right < left or r.left > right or r.bottom < top or r.top > bottom)
+
+
+def cull_text_nodes(left, top, right, bottom):
+    """
+    Find the text nodes intersecting a viewport rectangle by walking only the visible DOM.
+
+    A TreeWalker filter measures each element's bounding box and rejects the whole subtree
+    when it misses the rectangle, so text outside the rectangle is never measured. Once an
+    element in plain block flow starts below the rectangle the walk stops, since later
+    elements in document order are laid out further down.
 
     Args:
-        el (js.Element): The DOM element to remove.
-        timeout (int, optional): Delay in milliseconds before removal. Defaults to 2000.
+        left (float): Left edge of the rectangle.
+        top (float): Top edge of the rectangle.
+        right (float): Right edge of the rectangle.
+        bottom (float): Bottom edge of the rectangle.
+
+    Returns:
+        list[tuple[js.Node, tuple]]: Each intersecting node, in document order, with its
+        first intersecting (left, top, right, bottom) rectangle in viewport coordinates.
+
+    Notes:
+        - Elements with an empty box (e.g. `display: contents`) are always descended into,
+          since their children can still be visible.
+        - Descendants that overflow a rejected element's box are missed.
+        - The walk only stops early when the element and its ancestors are in block flow,
+          so text in another flex, grid, float or multi-column column is still found.
+    """
+    node_filter = window.NodeFilter
+    state = {"past_bottom": False}
+
+    def accept(node):
+        if node.nodeType == window.Node.TEXT_NODE:
+            return node_filter.FILTER_ACCEPT
+        box = node.getBoundingClientRect()
+        if box.width == 0 and box.height == 0:
+            return node_filter.FILTER_SKIP
+        if _intersects(box, left, top, right, bottom):
+            return node_filter.FILTER_SKIP
+        if box.top > bottom and _in_block_flow(node):
+            state["past_bottom"] = True
+            return node_filter.FILTER_ACCEPT  # hand the element back so the walk can stop
+        return node_filter.FILTER_REJECT
+
+    accept_proxy = create_proxy(accept)
+    walker = document.createTreeWalker(
+        document.body, node_filter.SHOW_ELEMENT | node_filter.SHOW_TEXT, accept_proxy, False
+    )
+    range_ = document.createRange()
+    matches = []
+    try:
+        node = walker.nextNode()
+        while node and not state["past_bottom"]:
+            range_.selectNodeContents(node)
+            for r in range_.getClientRects():
+                if _intersects(r, left, top, right, bottom):
+                    matches.append((node, (r.left, r.top, r.right, r.bottom)))
+                    break
+            node = walker.nextNode()
+    finally:
+        accept_proxy.destroy()
+    return matches
+
+
+class HighlightLayer:
+    """
+    A single overlay that draws the highlight boxes of a drag and clears them together.
+
+    Boxes are pooled divs inside one fixed-position container: a drag reuses the boxes of
+    the previous one, new boxes are inserted through a DocumentFragment in one append, and
+    one shared timer (with one long-lived proxy) hides the whole layer, instead of a div,
+    a timer and a proxy per highlighted rectangle.
+
+    Attributes:
+        nodes_created (int): DOM nodes created so far, across all drags.
+        proxies_created (int): Pyodide proxies created so far, across all drags.
+        last_drag (dict): Boxes drawn, nodes created and proxies created by the last drag.
     """
-    holder = {"cb": None}  # so we can destroy once
 
-    def _remove(el=el, holder=holder):
-        try:
-            el.remove()
-        finally:
-            cb = holder.pop("cb", None)
-            if cb is not None:
-                cb.destroy()
+    def __init__(self):
+        self.container = None
+        self.boxes = []
+        self.timer = None
+        self._hide_proxy = None
+        self.nodes_created = 0
+        self.proxies_created = 0
+        self.last_drag = {}
+
+    def _create_container(self):
+        """Create the overlay container and the shared hide callback on first use."""
+        container = document.createElement("div")
+        container.id = HIGHLIGHT_LAYER_ID
+        s = container.style
+        s.position = "fixed"
+        s.left = "0"
+        s.top = "0"
+        s.width = "0"
+        s.height = "0"
+        s.overflow = "visible"
+        s.pointerEvents = "none"
+        s.zIndex = 999999
+        document.body.appendChild(container)
+        self.container = container
+        self.nodes_created += 1
+        self._hide_proxy = PROXIES.proxy(self.hide)
+        self.proxies_created += 1
+
+    def _create_box(self):
+        """Create one pooled highlight box (not yet attached)."""
+        box = document.createElement("div")
+        box.classList.add(HIGHLIGHT_CLASS)
+        s = box.style
+        s.position = "fixed"
+        s.border = "1px solid blue"
+        s.backgroundColor = "rgba(0, 0, 255, 0.1)"
+        s.pointerEvents = "none"
+        self.nodes_created += 1
+        return box
+
+    def show(self, rects, timeout=HIGHLIGHT_DURATION_MS):
+        """
+        Replace the drawn highlights and schedule them to disappear.
+
+        Args:
+            rects (list[tuple]): (left, top, right, bottom) boxes in viewport coordinates.
+            timeout (int, optional): Delay in milliseconds before the highlights are hidden.
+                Defaults to HIGHLIGHT_DURATION_MS.
+        """
+        nodes_before = self.nodes_created
+        proxies_before = self.proxies_created
+        if self.container is None or not self.container.isConnected:
+            self._create_container()
+            self.boxes = []
 
-    cb = create_proxy(_remove)  # persistent JS callback
-    holder["cb"] = cb
-    window.setTimeout(cb, timeout)
+        fragment = None
+        for i, (left, top, right, bottom) in enumerate(rects):
+            if i == len(self.boxes):
+                if fragment is None:
+                    fragment = document.createDocumentFragment()
+                box = self._create_box()
+                fragment.appendChild(box)
+                self.boxes.append(box)
+            s = self.boxes[i].style
+            s.left = f"{left}px"
+            s.top = f"{top}px"
+            s.width = f"{right - left}px"
+            s.height = f"{bottom - top}px"
+            s.display = "block"
+        for box in self.boxes[len(rects) :]:
+            box.style.display = "none"
+        if fragment is not None:
+            self.container.appendChild(fragment)
+        self.container.style.display = "block"
+
+        window.clearTimeout(self.timer)
+        self.timer = window.setTimeout(self._hide_proxy, timeout)
+        self.last_drag = {
+            "boxes": len(rects),
+            "nodes_created": self.nodes_created - nodes_before,
+            "proxies_created": self.proxies_created - proxies_before,
+        }
+        log.debug("Highlights drawn: %s", self.last_drag)
+
+    def hide(self):
+        """Hide every highlight and trim the pool to MAX_POOLED_HIGHLIGHTS boxes."""
+        self.timer = None
+        if self.container is None:
+            return
+        self.container.style.display = "none"
+        for box in self.boxes[MAX_POOLED_HIGHLIGHTS:]:
+            box.remove()
+        del self.boxes[MAX_POOLED_HIGHLIGHTS:]
+
+
+# Shared overlay every drag draws its highlights into
+HIGHLIGHT_LAYER = HighlightLayer()
 
 
 def get_and_highlight_text_in_rect(x1, y1, x2, y2):
@@ -39,13 +371,12 @@ def get_and_highlight_text_in_rect(x1, y1, x2, y2):
 
     This function:
       1. Defines a rectangle using the given screen coordinates (x1, y1) and (x2, y2).
-      2. Walks through all text nodes in the document body.
-      3. For each text node, checks whether any part of its bounding client rect
-         intersects with the defined rectangle.
-      4. If overlapping text is found:
+      2. Looks up the text nodes whose client rects intersect the rectangle, either in
+         TEXT_INDEX or by walking only the visible part of the DOM (see TEXT_LOOKUP_MODE).
+      3. If overlapping text is found:
          - Collects and returns the text content (whitespace-trimmed).
-         - Visually highlights the region by overlaying a semi-transparent blue box.
-         - The highlight box automatically disappears after 2 seconds.
+         - Visually highlights each match with a semi-transparent blue box in HIGHLIGHT_LAYER.
+         - The boxes all disappear together after HIGHLIGHT_DURATION_MS.
 
     Args:
         x1 (float): X-coordinate of the first corner of the rectangle.
@@ -63,40 +394,17 @@ def get_and_highlight_text_in_rect(x1, y1, x2, y2):
         "bottom": max(y1, y2),
     }
 
-    walker = document.createTreeWalker(document.body, window.NodeFilter.SHOW_TEXT, None, False)
-    collected_text = []
+    if TEXT_LOOKUP_MODE == "cull":
+        matches = cull_text_nodes(rect["left"], rect["top"], rect["right"], rect["bottom"])
+    else:
+        matches = TEXT_INDEX.query(rect["left"], rect["top"], rect["right"], rect["bottom"])
 
-    node = walker.nextNode()
-    while node:
-        range_ = document.createRange()
-        range_.selectNodeContents(node)
-        rects = range_.getClientRects()
-
-        for r in rects:
-            if not (
-                r.right < rect["left"] or r.left > rect["right"] or r.bottom < rect["top"] or r.top > rect["bottom"]
-            ):
-                txt = node.textContent.strip()
-                if txt:
-                    collected_text.append(txt)
-
-                highlight = document.createElement("div")
-                highlight.classList.add(HIGHLIGHT_CLASS)
-                s = highlight.style
-                s.position = "fixed"
-                s.left = f"{r.left}px"
-                s.top = f"{r.top}px"
-                s.width = f"{r.width}px"
-                s.height = f"{r.height}px"
-                s.border = "1px solid blue"
-                s.backgroundColor = "rgba(0, 0, 255, 0.1)"
-                s.pointerEvents = "none"
-                s.zIndex = 999999
-                document.body.appendChild(highlight)
-
-                _schedule_auto_remove(highlight, 2000)  # ← each box self-destructs in 2s
-                break
+    collected_text = []
+    for node, _ in matches:
+        txt = node.textContent.strip()
+        if txt:
+            collected_text.append(txt)
 
-        node = walker.nextNode()
+    HIGHLIGHT_LAYER.show([box for _, box in matches])  # ← all boxes disappear together in 2s
 
     return " ".join(collected_text)
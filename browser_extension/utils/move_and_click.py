@@ -1,7 +1,132 @@
 from js import MouseEvent
-from js import console
+from js import Object
+from js import WeakMap
 from js import document
 from js import window
+from pyodide.ffi import to_js
+
+from .make_highlights import is_own_node
+from .logger import Logger
+from .proxies import PROXIES
+
+log = Logger("misclick.click")
+
+# Tags that are clickable whatever their style
+CLICKABLE_TAGS = {"button", "a", "input", "select"}
+
+# Attributes whose changes can make an element (or its descendants) clickable or not
+# "style" is left out: the fake cursor rewrites its inline style every animation frame, and
+# observing it would call back into Python on every frame
+CLICKABILITY_ATTRIBUTES = ["class", "onclick", "href", "role", "disabled", "hidden"]
+
+
+def is_clickable(el):
+    """
+    Check whether a single element looks interactive, without consulting the cache.
+
+    Args:
+        el (js.Element): The element to check.
+
+    Returns:
+        bool: True for buttons, links, inputs, selects, elements with an onclick handler
+        and elements styled with `cursor: pointer`.
+    """
+    return bool(el.tagName.lower() in CLICKABLE_TAGS or el.onclick or window.getComputedStyle(el).cursor == "pointer")
+
+
+class ClickabilityResolver:
+    """
+    Find the clickable element under the cursor, memoizing the answer per element.
+
+    Checking clickability calls `getComputedStyle`, which forces a style recalculation.
+    The resolver walks from the hit element up to its nearest clickable ancestor and
+    remembers the result for every element on the way in a WeakMap (so removed elements
+    can still be garbage collected). Hovering the same regions again costs a map lookup.
+    The whole cache is dropped when a MutationObserver sees an attribute change that can
+    affect clickability, or elements being moved, anywhere outside the extension's own
+    elements. Inline style changes are not observed, so an element that only gains
+    `cursor: pointer` through its style attribute is picked up on the next other change.
+
+    Attributes:
+        hits (int): Lookups answered from the cache.
+        misses (int): Lookups that had to check the element itself.
+    """
+
+    def __init__(self):
+        self.cache = WeakMap.new()
+        self.observer = None
+        self._mutation_proxy = None
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self):
+        """Forget every memoized result."""
+        self.cache = WeakMap.new()
+
+    def _on_mutations(self, records, observer):  # noqa: ARG002
+        """MutationObserver callback: invalidate unless only the extension's own elements changed."""
+        for record in records:
+            if is_own_node(record.target):
+                continue
+            changed = list(record.addedNodes) + list(record.removedNodes)
+            if record.type != "childList" or not all(is_own_node(node) for node in changed):
+                self.invalidate()
+                return
+
+    def watch(self):
+        """Start observing the page for changes that affect clickability (once, on first use)."""
+        self._mutation_proxy = PROXIES.proxy(self._on_mutations)
+        self.observer = window.MutationObserver.new(self._mutation_proxy)
+        options = {"attributes": True, "attributeFilter": CLICKABILITY_ATTRIBUTES, "childList": True, "subtree": True}
+        self.observer.observe(document.documentElement, to_js(options, dict_converter=Object.fromEntries))
+
+    def resolve(self, el):
+        """
+        Find the nearest clickable element at or above `el`.
+
+        Args:
+            el (js.Element | None): The element under the cursor.
+
+        Returns:
+            js.Element | None: The element itself or its nearest clickable ancestor, or None.
+        """
+        if self.observer is None:
+            self.watch()
+        path = []
+        target = None
+        node = el
+        while node:
+            if self.cache.has(node):
+                self.hits += 1
+                target = self.cache.get(node)
+                break
+            self.misses += 1
+            if is_clickable(node):
+                target = node
+                path.append(node)
+                break
+            path.append(node)
+            node = node.parentElement
+        for visited in path:
+            self.cache.set(visited, target)
+        return target
+
+
+# Shared resolver for cursor clicks and wander mode
+CLICKABILITY = ClickabilityResolver()
+
+
+def find_clickable(el):
+    """
+    Find the clickable element at or above `el`, using the shared memoized resolver.
+
+    Args:
+        el (js.Element | None): The element under the cursor.
+
+    Returns:
+        js.Element | None: The element to click, or None if nothing there is clickable.
+    """
+    return CLICKABILITY.resolve(el)
 
 
 def trigger_click(el):
@@ -21,48 +146,33 @@ def trigger_click(el):
 
 def move_and_maybe_click(cursor, offset_x, offset_y, should_click):
     """
-    Move a fake cursor element across the screen and optionally simulate a click.
+    Move a fake cursor across the screen and optionally simulate a click.
 
     The cursor's new position is calculated relative to its current position,
-    constrained within the visible window boundaries. After moving, the function
-    checks which element lies beneath the cursor, and if `should_click` is True,
-    simulates a click on that element if it appears to be interactive.
+    constrained within the visible window boundaries. If `should_click` is True, the
+    element beneath the cursor is looked up and clicked if it appears to be interactive.
 
     Args:
-        cursor (js.Element): The fake cursor <div> element to move.
+        cursor (CursorState): The fake cursor's state.
         offset_x (float): Horizontal offset (in pixels) to move the cursor.
         offset_y (float): Vertical offset (in pixels) to move the cursor.
         should_click (bool): Whether to attempt a click on the element under the cursor.
 
     Behavior:
-        - Updates the cursor's `style.left` and `style.top` positions.
-        - Logs the new coordinates to the console.
-        - If `should_click` is True and the underlying element is considered clickable
-          (button, link, input, select, or styled with `cursor: pointer`), triggers
-          a synthetic mouse click sequence on that element.
+        - Updates the cursor position with a single transform write; no layout is read
+          unless a click is requested.
+        - Logs the new coordinates at DEBUG level.
+        - If `should_click` is True and the underlying element or one of its ancestors is
+          considered clickable (button, link, input, select, onclick handler, or styled with
+          `cursor: pointer`), triggers a synthetic mouse click sequence on the nearest one.
     """
-    current_x = float(cursor.style.left.replace("px", "") or 0)
-    current_y = float(cursor.style.top.replace("px", "") or 0)
-
-    new_x = current_x + offset_x
-    new_y = current_y + offset_y
-
-    max_x = window.innerWidth - cursor.offsetWidth
-    max_y = window.innerHeight - cursor.offsetHeight
-    new_x = max(0, min(new_x, max_x))
-    new_y = max(0, min(new_y, max_y))
-
-    cursor.style.left = f"{new_x}px"
-    cursor.style.top = f"{new_y}px"
-
-    console.log(new_x, new_y)
-
-    el = document.elementFromPoint(new_x, new_y)
-    if should_click and el:
-        tag = el.tagName.lower()
-        clickable = (
-            tag in ["button", "a", "input", "select"] or el.onclick or window.getComputedStyle(el).cursor == "pointer"
-        )
-        if clickable:
-            console.log("Clicking:", el)
-            trigger_click(el)
+    new_x, new_y = cursor.move_by(offset_x, offset_y)
+
+    log.debug("Moved to %s %s", new_x, new_y)
+
+    if not should_click:
+        return
+    el = find_clickable(document.elementFromPoint(new_x, new_y))
+    if el:
+        log.debug("Clicking: %s", el)
+        trigger_click(el)
@@ -0,0 +1,78 @@
+from pyodide.ffi import create_once_callable
+from pyodide.ffi import create_proxy
+
+
+class ProxyRegistry:
+    """
+    Owner of the JS proxies that wrap Python callbacks handed to the browser.
+
+    Every `create_proxy` call keeps its Python callable alive until the proxy is destroyed,
+    so creating one per event or per timer grows memory for as long as the page is open.
+    Long-lived callbacks (event listeners, timers that are re-armed or cancelled) get one
+    proxy per function, created on first use and reused afterwards. One-shot callbacks
+    (timers that always fire) are wrapped with `create_once_callable`, which frees itself
+    after its single call.
+
+    Attributes:
+        persistent (dict): Reused proxies, keyed by the function they wrap.
+        pending_once (int): One-shot callbacks created but not called yet.
+    """
+
+    def __init__(self):
+        self.persistent = {}
+        self.pending_once = 0
+
+    @property
+    def live(self):
+        """Number of proxies currently alive (debug counter; flat over time when nothing leaks)."""
+        return len(self.persistent) + self.pending_once
+
+    def proxy(self, func):
+        """
+        Get the reusable proxy of a long-lived callback, creating it on first use.
+
+        Args:
+            func (Callable): A module-level function or bound method. Closures created per
+                call are new functions each time and would each get their own proxy.
+
+        Returns:
+            JsProxy: The proxy, the same one on every call with the same function.
+        """
+        proxy = self.persistent.get(func)
+        if proxy is None:
+            proxy = self.persistent[func] = create_proxy(func)
+        return proxy
+
+    def once(self, func):
+        """
+        Wrap a callback that the browser calls exactly once, such as a timer never cancelled.
+
+        Args:
+            func (Callable): The callback.
+
+        Returns:
+            JsProxy: A callable that frees itself after being called. If it is never called,
+            it stays alive, so do not use it for listeners or cancellable timers.
+        """
+        self.pending_once += 1
+
+        def call(*args):
+            self.pending_once -= 1
+            return func(*args)
+
+        return create_once_callable(call)
+
+    def release(self, func):
+        """
+        Destroy the reusable proxy of a callback that is no longer registered anywhere.
+
+        Args:
+            func (Callable): The function passed to `proxy`.
+        """
+        proxy = self.persistent.pop(func, None)
+        if proxy is not None:
+            proxy.destroy()
+
+
+# Shared registry for every callback the extension hands to the browser
+PROXIES = ProxyRegistry()
@@ -0,0 +1,79 @@
+from js import Object
+from js import window
+from pyodide.ffi import to_js
+
+from .proxies import PROXIES
+
+# Source tag of window messages coming from the relay through content.js
+FROM_RELAY = "misclick-relay"
+
+# Source tag of window messages for content.js to send to the relay
+TO_RELAY = "misclick-python"
+
+
+class RelayEvent:
+    """
+    The part of a WebSocket event the extension uses.
+
+    Args:
+        data (str | js.ArrayBuffer | None): The frame, as a WebSocket would deliver it.
+    """
+
+    __slots__ = ("data",)
+
+    def __init__(self, data=None):
+        self.data = data
+
+
+class RelayBridge:
+    """
+    Stand-in for the relay WebSocket, backed by the extension's shared background socket.
+
+    The extension keeps one relay connection for all tabs, in its background worker, which
+    forwards frames to the active tab. The Python runtime runs in the page, so content.js
+    hands those frames over with `window.postMessage`, and this class turns them back into
+    WebSocket-like "open", "message" and "close" events. `send` goes the other way.
+    """
+
+    def __init__(self):
+        self.listeners = {"open": [], "message": [], "close": []}
+        self._proxy = PROXIES.proxy(self._on_window_message)
+        window.addEventListener("message", self._proxy)
+
+    def addEventListener(self, type_, listener):  # noqa: N802 - mirrors the WebSocket API
+        """
+        Register a listener, as on a WebSocket.
+
+        Args:
+            type_ (str): "open", "message" or "close".
+            listener (Callable): Called with a RelayEvent.
+        """
+        self.listeners[type_].append(listener)
+
+    def connect(self):
+        """Tell content.js the listeners are attached; it answers with the relay's status."""
+        self._post({"type": "ready"})
+
+    def send(self, data):
+        """
+        Send a text frame to the relay.
+
+        Args:
+            data (str): The frame.
+        """
+        self._post({"type": "send", "data": data})
+
+    def _post(self, message):
+        """Post a message to content.js."""
+        message["source"] = TO_RELAY
+        window.postMessage(to_js(message, dict_converter=Object.fromEntries), "*")
+
+    def _on_window_message(self, event):
+        """Dispatch messages from content.js to the registered listeners."""
+        message = event.data
+        if event.source != window or getattr(message, "source", None) != FROM_RELAY:
+            return
+        type_ = message.type
+        relay_event = RelayEvent(message.data if type_ == "message" else None)
+        for listener in self.listeners.get(type_, []):
+            listener(relay_event)
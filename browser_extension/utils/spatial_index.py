@@ -0,0 +1,79 @@
+# Side (px) of the square cells rectangles are bucketed into
+# A few lines of text tall: small enough that a drag only visits nearby text, large enough
+# that a line of text spans a handful of cells
+GRID_CELL_SIZE = 128
+
+
+class GridIndex:
+    """
+    A uniform grid of rectangles for fast rectangle intersection queries.
+
+    Every rectangle is added to each cell it overlaps, so a query only tests the rectangles
+    in the cells the query overlaps instead of every rectangle on the page. Rectangles are
+    stored under a key (e.g. the index of the text node they belong to); a key may have
+    several rectangles, such as a text node wrapping over multiple lines.
+
+    This module has no browser dependencies, so it can be benchmarked outside Pyodide.
+
+    Args:
+        cell_size (float, optional): Side of a grid cell. Defaults to GRID_CELL_SIZE.
+    """
+
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+        # (key, (left, top, right, bottom)) in insertion order
+        self.entries = []
+
+    def __len__(self):
+        return len(self.entries)
+
+    def insert(self, key, left, top, right, bottom):
+        """
+        Add a rectangle.
+
+        Args:
+            key (int): What the rectangle belongs to. Keys are returned by `query`.
+            left (float): Left edge.
+            top (float): Top edge.
+            right (float): Right edge.
+            bottom (float): Bottom edge.
+        """
+        entry = len(self.entries)
+        self.entries.append((key, (left, top, right, bottom)))
+        size = self.cell_size
+        for cx in range(int(left // size), int(right // size) + 1):
+            for cy in range(int(top // size), int(bottom // size) + 1):
+                self.cells.setdefault((cx, cy), []).append(entry)
+
+    def query(self, left, top, right, bottom):
+        """
+        Find the rectangles intersecting a query rectangle (edges touching count).
+
+        Args:
+            left (float): Left edge of the query.
+            top (float): Top edge of the query.
+            right (float): Right edge of the query.
+            bottom (float): Bottom edge of the query.
+
+        Returns:
+            list[tuple[int, tuple]]: (key, rect) for the first intersecting rectangle of each
+            key, in insertion order.
+        """
+        size = self.cell_size
+        candidates = set()
+        for cx in range(int(left // size), int(right // size) + 1):
+            for cy in range(int(top // size), int(bottom // size) + 1):
+                candidates.update(self.cells.get((cx, cy), ()))
+
+        matches = []
+        seen = set()
+        for entry in sorted(candidates):
+            key, rect = self.entries[entry]
+            if key in seen:
+                continue
+            r_left, r_top, r_right, r_bottom = rect
+            if not (r_right < left or r_left > right or r_bottom < top or r_top > bottom):
+                seen.add(key)
+                matches.append((key, rect))
+        return matches
@@ -1,6 +1,7 @@
 from js import document
 from js import window
-from pyodide.ffi import create_proxy
+
+from .proxies import PROXIES
 
 
 def create_toast(message="Hello from PyScript 🎉"):
@@ -67,8 +68,6 @@ def show_toast(msg="Hello from PyScript 🎉"):
         def remove():
             toast.remove()
 
-        rm_cb = create_proxy(remove)
-        window.setTimeout(rm_cb, 500)  # remove after fade out
+        window.setTimeout(PROXIES.once(remove), 500)  # remove after fade out
 
-    cb = create_proxy(hide_toast)
-    window.setTimeout(cb, 3000)
+    window.setTimeout(PROXIES.once(hide_toast), 3000)
@@ -0,0 +1,59 @@
+import struct
+
+# WebSocket subprotocol offered on connect to negotiate binary gesture frames with the server
+BINARY_SUBPROTOCOL = "misclick.bin.v1"
+
+# Fixed frame layout, little endian, 13 bytes (mirrors relay/wire.py on the server):
+#   uint32  seq    sequence number assigned by the sender
+#   float32 x      horizontal delta, normalized to the sender's viewport width
+#   float32 y      vertical delta, normalized to the sender's viewport height
+#   uint8   flags  bit 0: click, bits 1-2: gesture type, bits 3-7: number of fingers
+GESTURE_FRAME = struct.Struct("<IffB")
+
+# Gesture type for each 2-bit code stored in the flags byte
+GESTURE_TYPES = ["touch", "scroll", "drag", "move"]
+
+
+def decode_gesture(data):
+    """
+    Unpack a binary gesture frame into the same shape as the JSON gesture payload.
+
+    Args:
+        data (bytes): A GESTURE_FRAME encoded frame.
+
+    Returns:
+        dict: Keys seq, x, y, click (0/1), fingers and type.
+
+    Raises:
+        ValueError: If the frame does not have the GESTURE_FRAME size.
+    """
+    if len(data) != GESTURE_FRAME.size:
+        raise ValueError(f"Expected a {GESTURE_FRAME.size} byte gesture frame, got {len(data)} bytes")
+    seq, x, y, flags = GESTURE_FRAME.unpack(data)
+    return {
+        "seq": seq,
+        "x": x,
+        "y": y,
+        "click": flags & 1,
+        "fingers": flags >> 3,
+        "type": GESTURE_TYPES[flags >> 1 & 0b11],
+    }
+
+
+def decode_gestures(data):
+    """
+    Unpack one or more binary gesture frames sent back to back (a batch).
+
+    Args:
+        data (bytes): A whole number of GESTURE_FRAME encoded frames.
+
+    Returns:
+        list[dict]: One decoded gesture per frame, in order.
+
+    Raises:
+        ValueError: If the data is empty or not a whole number of frames.
+    """
+    size = GESTURE_FRAME.size
+    if not data or len(data) % size:
+        raise ValueError(f"Expected a multiple of {size} bytes, got {len(data)} bytes")
+    return [decode_gesture(data[i : i + size]) for i in range(0, len(data), size)]
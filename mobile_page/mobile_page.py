@@ -1,15 +1,79 @@
 import json
+import struct
+from js import URLSearchParams
 from js import WebSocket
 from js import clearTimeout
-from js import console
 from js import document
+from js import requestAnimationFrame
+from js import setInterval
 from js import setTimeout
 from js import window
-from pyodide.ffi import create_proxy
+from pyodide.ffi import to_js
+
+from clock_sync import ClockSync
+from logger import Logger
+from proxies import PROXIES
+
+# Logger for the page; per-gesture messages are DEBUG and skipped unless enabled
+log = Logger("misclick.page")
+
+# Pairing session token from the QR code URL; routes this page to its browser's room
+SESSION = URLSearchParams.new(window.location.search).get("session")
+
+# Close code the relay uses for an unknown or missing session token (mirrors app.py)
+POLICY_VIOLATION = 1008
+
+# Offer compact binary gesture frames to the server; JSON is used if it does not accept them
+USE_BINARY_FRAMES = True
+
+# WebSocket subprotocol that negotiates binary gesture frames
+BINARY_SUBPROTOCOL = "misclick.bin.v1"
+
+# Binary gesture frame layout, little endian, 13 bytes (mirrors relay/wire.py on the server):
+#   uint32 seq, float32 x, float32 y, uint8 flags (bit 0: click, bits 1-2: type, bits 3-7: fingers)
+GESTURE_FRAME = struct.Struct("<IffB")
+
+# Gesture type -> 2-bit code stored in the flags byte
+GESTURE_CODES = {"touch": 0, "scroll": 1, "drag": 2, "move": 3}
+
+# Sequence number of the last gesture sent
+SEQ = 0
+
+# Gestures produced within this window (ms) are sent together as one frame; 0 sends each immediately
+BATCH_WINDOW_MS = 12
+
+# Encoded gestures (bytes or dicts) waiting for the current batch window to close
+PENDING_GESTURES = []
+
+# Whether a flush of PENDING_GESTURES is already scheduled
+FLUSH_SCHEDULED = False
+
+# Milliseconds between checks of the live proxy count, and the count last logged
+PROXY_REPORT_INTERVAL = 10000
+LAST_LIVE_PROXIES = 0
+
+# Milliseconds between gestures sampled for latency tracing; traced gestures are sent as JSON
+# with a "trace" object of timestamps that the relay and the extension complete. 0 disables tracing
+LATENCY_TRACE_INTERVAL = 1000
+
+# Input event time (performance.now() clock, ms) of the last traced gesture
+LAST_TRACE = 0
+
+# Milliseconds between clock-sync pings to the relay, which latency traces are timed against
+CLOCK_SYNC_INTERVAL = 5000
+
+# Offset of this page's clock to the relay's
+clock = ClockSync()
+
+# Id of the chunked copied text being reassembled, and its chunks received so far by index
+COPIED_TEXT_ID = None
+COPIED_TEXT_CHUNKS = {}
 
 ws_url = f"ws://{window.location.hostname}:{window.location.port}/ws"
-console.log(f"Starting off with {ws_url}")
-ws = WebSocket.new(ws_url)
+if SESSION:
+    ws_url += f"?session={SESSION}"
+log.info("Starting off with %s", ws_url)
+ws = WebSocket.new(ws_url, to_js([BINARY_SUBPROTOCOL])) if USE_BINARY_FRAMES else WebSocket.new(ws_url)
 
 # Initial touch coordinates (updated on touch start)
 START_X = 0
@@ -37,6 +101,38 @@ LONG_PRESS_TIME = 300  # ms
 # Minimum movement (in pixels) to consider the gesture as a drag/scroll rather than a tap
 MOVE_THRESHOLD = 5  # px
 
+# Stream finger movement as 'move' deltas while scrolling, instead of one delta on touchend
+STREAM_MOVES = True
+
+# Maximum number of 'move' deltas streamed per second (sampled with requestAnimationFrame)
+STREAM_RATE_HZ = 60
+
+# Milliseconds a frame may come early and still count as a full STREAM_RATE_HZ interval;
+# requestAnimationFrame timestamps jitter (16.6 ms deltas at 60 Hz), and rejecting those
+# would skip whole frames and leave irregular 33 ms gaps
+STREAM_JITTER_MS = 2
+
+# Whether a finger is currently on the touch area
+TOUCH_ACTIVE = False
+
+# Latest touch position seen by touchmove, and the event's timeStamp
+LATEST_X = 0
+LATEST_Y = 0
+LATEST_TOUCH_TIME = 0
+
+# Touch position already reported to the extension during the current gesture
+SENT_X = 0
+SENT_Y = 0
+
+# Whether any 'move' delta was streamed during the current gesture
+STREAMED = False
+
+# Whether an animation frame is already scheduled to stream the pending delta
+STREAM_SCHEDULED = False
+
+# requestAnimationFrame timestamp (ms) of the last streamed delta
+LAST_STREAM_TIME = 0
+
 
 def create_toast(message="Hello from PyScript 🎉"):
     """
@@ -73,7 +169,7 @@ def create_toast(message="Hello from PyScript 🎉"):
     return toast
 
 
-async def sendCoords(x, y, click, fingers, type_):
+async def sendCoords(x, y, click, fingers, type_, touched=None):
     """
     Send touch coordinates and event information to the WebSocket server.
 
@@ -82,27 +178,97 @@ async def sendCoords(x, y, click, fingers, type_):
         y (float): Normalized Y-coordinate (relative to viewport height).
         click (bool): Whether the gesture is a click/tap.
         fingers (int): Number of fingers involved in the touch event.
-        type_ (str): Type of gesture ('touch', 'drag', 'scroll').
+        type_ (str): Type of gesture ('touch', 'drag', 'scroll', or 'move' for streamed deltas).
+        touched (float | None): timeStamp of the input event the gesture comes from, if known.
 
     Returns:
         None
 
     Notes:
         - Converts click to 1/0 before sending.
-        - Includes browser width and height in the payload.
-    """
-    payload = {
-        "x": x,
-        "y": y,
-        "click": 1 if click else 0,
-        "fingers": fingers,
-        "browser_width": BROWSER_WIDTH,
-        "browser_height": BROWSER_HEIGHT,
-        "type": type_,
-    }
-    console.log(x, y, click, fingers, type_)
-    console.log("Sending coordinates", payload)
-    ws.send(json.dumps(payload))
+        - Tags every gesture with an increasing sequence number.
+        - Traces one gesture per LATENCY_TRACE_INTERVAL once the clock offset is known: it is
+          sent as JSON, even over binary frames, with its input time in the relay's clock.
+        - Encodes a 13-byte binary frame when the server accepted BINARY_SUBPROTOCOL, JSON otherwise.
+        - Queues the gesture for the current BATCH_WINDOW_MS window (see flush_gestures).
+    """
+    global SEQ, FLUSH_SCHEDULED, LAST_TRACE
+    SEQ = (SEQ + 1) & 0xFFFFFFFF
+    log.debug("Gesture %s %s %s %s %s", x, y, click, fingers, type_)
+    trace = None
+    if (
+        LATENCY_TRACE_INTERVAL > 0
+        and touched is not None
+        and clock.offset is not None
+        and touched - LAST_TRACE >= LATENCY_TRACE_INTERVAL
+    ):
+        LAST_TRACE = touched
+        trace = {"touch": clock.to_relay(touched)}
+    if ws.protocol == BINARY_SUBPROTOCOL and trace is None:
+        flags = (1 if click else 0) | GESTURE_CODES[type_] << 1 | min(fingers, 0x1F) << 3
+        gesture = GESTURE_FRAME.pack(SEQ, x, y, flags)
+    else:
+        gesture = {
+            "seq": SEQ,
+            "x": x,
+            "y": y,
+            "click": 1 if click else 0,
+            "fingers": fingers,
+            "type": type_,
+        }
+        if trace is not None:
+            gesture["trace"] = trace
+        log.debug("Sending coordinates %s", gesture)
+
+    PENDING_GESTURES.append(gesture)
+    if BATCH_WINDOW_MS <= 0:
+        flush_gestures()
+    elif not FLUSH_SCHEDULED:
+        FLUSH_SCHEDULED = True
+        setTimeout(FLUSH_PROXY, BATCH_WINDOW_MS)
+
+
+def flush_gestures():
+    """
+    Send every queued gesture as a single WebSocket frame.
+
+    Effects:
+        - Binary gestures are concatenated into one frame of N * 13 bytes.
+        - JSON gestures are sent as one object, or as an array when there are several.
+        - A traced gesture is sent in a JSON frame of its own, stamped with its send time,
+          splitting the batch around it so gestures keep their order.
+    """
+    global PENDING_GESTURES, FLUSH_SCHEDULED
+    FLUSH_SCHEDULED = False
+    batch, PENDING_GESTURES = PENDING_GESTURES, []
+    start = 0
+    for index, gesture in enumerate(batch):
+        if isinstance(gesture, dict) and "trace" in gesture:
+            send_batch(batch[start:index])
+            gesture["trace"]["send"] = clock.now()
+            ws.send(json.dumps(gesture))
+            start = index + 1
+    send_batch(batch[start:])
+
+
+def send_batch(batch):
+    """
+    Send untraced gestures as a single WebSocket frame.
+
+    Parameters:
+        batch (list[bytes | dict]): Encoded gestures, all binary or all JSON.
+    """
+    if not batch:
+        return
+    if isinstance(batch[0], bytes):
+        ws.send(to_js(b"".join(batch)))
+    elif len(batch) == 1:
+        ws.send(json.dumps(batch[0]))
+    else:
+        ws.send(json.dumps(batch))
+
+
+FLUSH_PROXY = PROXIES.proxy(flush_gestures)
 
 
 async def touch_start(event):
@@ -115,23 +281,35 @@ async def touch_start(event):
     Effects:
         - Records initial touch coordinates (startX, startY).
         - Records number of fingers in contact.
+        - Resets the streaming state for the new gesture.
         - Sets up a long-press timer to enable drag mode if the press lasts LONG_PRESS_TIME.
     """
     global START_X, START_Y, NO_OF_FINGERS, IS_DRAGGING, DRAG_CANCELLED, PRESS_TIMER
+    global TOUCH_ACTIVE, LATEST_X, LATEST_Y, SENT_X, SENT_Y, STREAMED
     touch = event.touches.item(0)  # ✅ JS method to access first touch
     START_X = touch.clientX
     START_Y = touch.clientY
     NO_OF_FINGERS = event.touches.length
     IS_DRAGGING = False
     DRAG_CANCELLED = False
+    TOUCH_ACTIVE = True
+    LATEST_X = SENT_X = START_X
+    LATEST_Y = SENT_Y = START_Y
+    STREAMED = False
+    PRESS_TIMER = setTimeout(PROXIES.proxy(enable_drag), LONG_PRESS_TIME)
+
 
-    def enable_drag():
-        global IS_DRAGGING
-        if not DRAG_CANCELLED:
-            IS_DRAGGING = True
-            console.log("Long press → drag mode enabled")
+def enable_drag():
+    """
+    Long-press timer callback: turn the current touch into a drag unless it already moved.
 
-    PRESS_TIMER = setTimeout(create_proxy(enable_drag), LONG_PRESS_TIME)
+    Effects:
+        - Sets IS_DRAGGING when the gesture was not cancelled by movement.
+    """
+    global IS_DRAGGING
+    if not DRAG_CANCELLED:
+        IS_DRAGGING = True
+        log.debug("Long press → drag mode enabled")
 
 
 async def touch_move(event):
@@ -143,16 +321,60 @@ async def touch_move(event):
 
     Effects:
         - Cancels drag initiation if movement exceeds MOVE_THRESHOLD before long-press.
+        - Once the gesture is a scroll, records the latest position and schedules an
+          animation frame to stream it (see stream_frame).
     """
-    global DRAG_CANCELLED
+    global DRAG_CANCELLED, LATEST_X, LATEST_Y, LATEST_TOUCH_TIME, STREAM_SCHEDULED
     touch = event.touches.item(0)
-    dx = abs(touch.clientX - START_X)
-    dy = abs(touch.clientY - START_Y)
+    LATEST_X = touch.clientX
+    LATEST_Y = touch.clientY
+    LATEST_TOUCH_TIME = event.timeStamp
+    dx = abs(LATEST_X - START_X)
+    dy = abs(LATEST_Y - START_Y)
 
     if not IS_DRAGGING and (dx > MOVE_THRESHOLD or dy > MOVE_THRESHOLD):
         DRAG_CANCELLED = True
         clearTimeout(PRESS_TIMER)
 
+    if STREAM_MOVES and DRAG_CANCELLED and not STREAM_SCHEDULED:
+        STREAM_SCHEDULED = True
+        requestAnimationFrame(STREAM_PROXY)
+
+
+async def stream_frame(timestamp):
+    """
+    Send the movement accumulated since the last streamed delta, at most once per frame.
+
+    Parameters:
+        timestamp (float): The requestAnimationFrame timestamp in milliseconds.
+
+    Effects:
+        - Reschedules itself while the STREAM_RATE_HZ interval, less STREAM_JITTER_MS, has not
+          elapsed yet.
+        - Sends a 'move' delta relative to the last reported position, so the cursor tracks
+          the finger instead of jumping once per swipe.
+    """
+    global STREAM_SCHEDULED, LAST_STREAM_TIME, SENT_X, SENT_Y, STREAMED
+    STREAM_SCHEDULED = False
+    if not TOUCH_ACTIVE:
+        return  # touch_end already sent the remainder
+    if timestamp - LAST_STREAM_TIME < 1000 / STREAM_RATE_HZ - STREAM_JITTER_MS:
+        STREAM_SCHEDULED = True
+        requestAnimationFrame(STREAM_PROXY)
+        return
+    if LATEST_X == SENT_X and LATEST_Y == SENT_Y:
+        return
+
+    deltaX = (LATEST_X - SENT_X) / BROWSER_WIDTH
+    deltaY = (LATEST_Y - SENT_Y) / BROWSER_HEIGHT
+    SENT_X, SENT_Y = LATEST_X, LATEST_Y
+    LAST_STREAM_TIME = timestamp
+    STREAMED = True
+    await sendCoords(deltaX, deltaY, False, NO_OF_FINGERS, "move", LATEST_TOUCH_TIME)
+
+
+STREAM_PROXY = PROXIES.proxy(stream_frame)
+
 
 async def touch_end(event):
     """
@@ -162,33 +384,40 @@ async def touch_end(event):
         event (JS TouchEvent): The touchend event from the browser.
 
     Effects:
-        - Clears the long-press timer.
+        - Clears the long-press timer and stops streaming.
         - Computes gesture type: 'touch', 'drag', or 'scroll'.
         - Normalizes end coordinates relative to browser dimensions.
-        - Sends gesture data via sendCoords to the WebSocket server.
+        - Sends gesture data via sendCoords to the WebSocket server. If the scroll was
+          streamed, only the movement not streamed yet is sent, as a final 'move' delta.
     """
-    global PRESS_TIMER
+    global PRESS_TIMER, TOUCH_ACTIVE
     clearTimeout(PRESS_TIMER)
+    TOUCH_ACTIVE = False
 
     # ✅ Access first changed touch via .item(0)
     touch = event.changedTouches.item(0)
     endX = touch.clientX
     endY = touch.clientY
 
-    deltaX = (endX - START_X) / BROWSER_WIDTH
-    deltaY = (endY - START_Y) / BROWSER_HEIGHT
+    # SENT_X/SENT_Y equal START_X/START_Y unless movement was already streamed
+    deltaX = (endX - SENT_X) / BROWSER_WIDTH
+    deltaY = (endY - SENT_Y) / BROWSER_HEIGHT
 
     click = False
     if IS_DRAGGING:
         type_ = "drag"
+    elif DRAG_CANCELLED and STREAMED:
+        type_ = "move"
+        if deltaX == 0 and deltaY == 0:
+            return
     elif DRAG_CANCELLED:
         type_ = "scroll"
     else:
         type_ = "touch"
         click = True
 
-    console.log(f"Type: {type_}, End coords: ({endX}, {endY})")
-    await sendCoords(deltaX, deltaY, click, NO_OF_FINGERS, type_)
+    log.debug("Type: %s, End coords: (%s, %s)", type_, endX, endY)
+    await sendCoords(deltaX, deltaY, click, NO_OF_FINGERS, type_, event.timeStamp)
 
 
 def update_textarea(text):
@@ -202,15 +431,15 @@ def update_textarea(text):
         - Logs the update action.
         - Replaces the textarea content with the provided text.
     """
-    console.log("Update textarea")
+    log.debug("Update textarea")
     doc = document.getElementById("copiedText")
     doc.value = text if text else ""
 
 
 touch_area = document.getElementById("touchArea")
-touch_area.addEventListener("touchstart", create_proxy(touch_start), {"passive": True})
-touch_area.addEventListener("touchmove", create_proxy(touch_move), {"passive": True})
-touch_area.addEventListener("touchend", create_proxy(touch_end), {"passive": True})
+touch_area.addEventListener("touchstart", PROXIES.proxy(touch_start), {"passive": True})
+touch_area.addEventListener("touchmove", PROXIES.proxy(touch_move), {"passive": True})
+touch_area.addEventListener("touchend", PROXIES.proxy(touch_end), {"passive": True})
 
 
 def onopen(event):  # <-- accept event arg
@@ -221,9 +450,11 @@ def onopen(event):  # <-- accept event arg
         event (JS Event): The WebSocket 'open' event.
 
     Effects:
-        - Logs connection success to the console.
+        - Logs connection success at INFO level.
+        - Pings the relay to estimate the clock offset used by latency traces.
     """
-    console.log("Connection opened from page")
+    log.info("Connection opened from page")
+    sync_clock()
 
 
 def onmessage(event):
@@ -236,11 +467,55 @@ def onmessage(event):
     Effects:
         - Parses JSON data from the server.
         - If 'copied_text' is present, updates the textarea using update_textarea().
+        - Collects 'copied_text_chunk' frames and updates the textarea once all chunks of
+          the latest copy have arrived.
+        - Updates the clock offset from the relay's pong replies.
+        - Ignores binary gesture frames relayed from other phones in the same session.
     """
+    if not isinstance(event.data, str):
+        return
     data = json.loads(event.data)
-    console.log(data)
+    if isinstance(data, dict) and data.get("type") == "pong":
+        clock.on_pong(data)
+        return
+    log.debug("Received %s", data)
     if data and data.get("copied_text"):
         update_textarea(data["copied_text"])
+    elif data and "copied_text_chunk" in data:
+        receive_text_chunk(data)
+
+
+def receive_text_chunk(data):
+    """
+    Reassemble copied text that the extension split into several frames.
+
+    Parameters:
+        data (dict): A frame with keys copied_text_chunk, id, index and total.
+
+    Effects:
+        - Starts over when a chunk of another copy arrives (frames arrive in order, so a
+          new id means the previous copy was interrupted).
+        - Updates the textarea once every chunk of the current copy is present.
+    """
+    global COPIED_TEXT_ID, COPIED_TEXT_CHUNKS
+    if data["id"] != COPIED_TEXT_ID:
+        COPIED_TEXT_ID = data["id"]
+        COPIED_TEXT_CHUNKS = {}
+    COPIED_TEXT_CHUNKS[data["index"]] = data["copied_text_chunk"]
+    if len(COPIED_TEXT_CHUNKS) == data["total"]:
+        update_textarea("".join(COPIED_TEXT_CHUNKS[i] for i in range(data["total"])))
+        COPIED_TEXT_CHUNKS = {}
+
+
+def sync_clock():
+    """
+    Ping the relay to refresh the clock offset used to time latency traces.
+
+    Effects:
+        - Sends a ping frame; the pong is handled by onmessage.
+    """
+    if ws.readyState == WebSocket.OPEN:
+        ws.send(clock.ping())
 
 
 def onclose(event):
@@ -251,12 +526,34 @@ def onclose(event):
         event (JS Event): The WebSocket 'close' event.
 
     Effects:
-        - Logs connection closure to the console.
+        - Logs connection closure at INFO level.
+        - Shows a toast when the relay refused the pairing token (close code 1008), e.g. a page
+          opened from the QR code of an earlier server run.
     """
-    console.log("Connection closed")
+    log.info("Connection closed")
+    if event.code == POLICY_VIOLATION:
+        log.warning("Pairing session %s was refused by the server", SESSION)
+        create_toast("Pairing expired, scan the QR code again")
 
 
 # Add event listeners
-ws.addEventListener("open", create_proxy(onopen))
-ws.addEventListener("message", create_proxy(onmessage))
-ws.addEventListener("close", create_proxy(onclose))
+ws.addEventListener("open", PROXIES.proxy(onopen))
+ws.addEventListener("message", PROXIES.proxy(onmessage))
+ws.addEventListener("close", PROXIES.proxy(onclose))
+
+
+def report_proxies():
+    """
+    Log the number of live proxies when it changed (debug aid: it should stay flat).
+
+    Effects:
+        - Updates LAST_LIVE_PROXIES.
+    """
+    global LAST_LIVE_PROXIES
+    if PROXIES.live != LAST_LIVE_PROXIES:
+        LAST_LIVE_PROXIES = PROXIES.live
+        log.debug("%d live proxies", LAST_LIVE_PROXIES)
+
+
+setInterval(PROXIES.proxy(report_proxies), PROXY_REPORT_INTERVAL)
+setInterval(PROXIES.proxy(sync_clock), CLOCK_SYNC_INTERVAL)
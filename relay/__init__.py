@@ -0,0 +1,33 @@
+from .assets import IMMUTABLE_CACHE_CONTROL
+from .assets import AssetStore
+from .assets import CachedFile
+from .broadcast import Client
+from .broadcast import Hub
+from .frames import Frame
+from .metrics import METRICS_CONTENT_TYPE
+from .metrics import render_metrics
+from .stats import watch_event_loop
+from .tracing import LatencyTracer
+from .tracing import now_ms
+from .wire import BINARY_SUBPROTOCOL
+from .wire import decode_gesture
+from .wire import decode_gestures
+from .wire import encode_gesture
+
+__all__ = [
+    "IMMUTABLE_CACHE_CONTROL",
+    "AssetStore",
+    "CachedFile",
+    "Client",
+    "Hub",
+    "Frame",
+    "METRICS_CONTENT_TYPE",
+    "render_metrics",
+    "watch_event_loop",
+    "LatencyTracer",
+    "now_ms",
+    "BINARY_SUBPROTOCOL",
+    "decode_gesture",
+    "decode_gestures",
+    "encode_gesture",
+]
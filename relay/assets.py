@@ -0,0 +1,374 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import time
+from collections.abc import Callable
+
+from fastapi import Request
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # opt-in (`pip install brotli`, not a declared dependency): only gzip variants without it
+    brotli = None
+
+# Content codings in order of preference when the client accepts several
+ENCODINGS = ["br", "gzip"]
+
+# Suffix appended inside the ETag of each compressed variant, so every representation has its own strong ETag
+ETAG_SUFFIXES = {"br": "-br", "gzip": "-gz"}
+
+# Fraction of the size a compressed variant must save to be kept
+MIN_COMPRESSION_SAVING = 0.1
+
+# Media types whose content is already compressed; they are never compressed again, since
+# the variants would be thrown away by MIN_COMPRESSION_SAVING after seconds of CPU work
+COMPRESSED_MEDIA_TYPES = {
+    "image/png",
+    "image/jpeg",
+    "image/gif",
+    "image/webp",
+    "image/avif",
+    "font/woff",
+    "font/woff2",
+    "application/zip",
+    "application/gzip",
+    "application/wasm",
+}
+
+# Media type prefixes that are always compressed formats
+COMPRESSED_MEDIA_PREFIXES = ("audio/", "video/")
+
+# Cache-Control for content-hashed URLs: the bytes behind such a URL never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# Number of hex digits of the content digest embedded in hashed file names
+HASHED_NAME_DIGITS = 10
+
+# Seconds between checks of a store's files for edits on behalf of the pages linking to them
+ASSET_CHECK_INTERVAL = 1.0
+
+# A single "bytes=start-end", "bytes=start-" or "bytes=-suffix" range
+BYTE_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+class CachedFile:
+    """
+    A file held in memory together with precompressed variants.
+
+    The file is read and compressed once, then only re-read when its modification time
+    changes, so serving it costs one `os.stat` instead of a read per request.
+
+    Parameters:
+        path (str): Path of the file on disk.
+        media_type (str): Content type to serve it with.
+        cache_control (str): Cache-Control header to serve it with.
+        transform (Callable[[bytes], bytes] | None): Applied to the file content on every load.
+        depends_on (Callable[[], object] | None): Returns a value that changes whenever the
+            transform's output would (e.g. a reload counter of the files it links to); the file is
+            reloaded when it changes, like when the file itself does.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        media_type: str,
+        cache_control: str = "no-cache",
+        transform: Callable[[bytes], bytes] | None = None,
+        depends_on: Callable[[], object] | None = None,
+    ):
+        self.path = path
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.transform = transform
+        self.depends_on = depends_on
+        # mtime of the file, and the dependency value, when it was last loaded
+        self.version = None
+        self.body = b""
+        self.digest = ""
+        self.variants: dict[str, bytes] = {}
+        # Times the content was (re)loaded
+        self.loads = 0
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reload the file and rebuild its ETag and compressed variants if it or its dependencies changed.
+
+        Notes:
+            - A variant is only kept when it saves at least MIN_COMPRESSION_SAVING of the size.
+            - Files of an already compressed media type (see is_compressed_media) get no variants.
+        """
+        version = os.stat(self.path).st_mtime_ns
+        if self.depends_on is not None:
+            version = (version, self.depends_on())
+        if version == self.version:
+            return
+        with open(self.path, "rb") as f:
+            body = f.read()
+        if self.transform is not None:
+            body = self.transform(body)
+        self.load(body)
+        self.version = version
+
+    def load(self, body: bytes):
+        """
+        Replace the cached content.
+
+        Parameters:
+            body (bytes): The new content.
+        """
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:16]
+        self.loads += 1
+        if is_compressed_media(self.media_type):
+            self.variants = {}
+            return
+        variants = {"gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(body)
+        limit = len(body) * (1 - MIN_COMPRESSION_SAVING)
+        self.variants = {encoding: data for encoding, data in variants.items() if len(data) <= limit}
+
+    def etag(self, encoding: str | None = None) -> str:
+        """
+        Strong ETag of one representation.
+
+        Parameters:
+            encoding (str | None): The content coding, None for the uncompressed file.
+
+        Returns:
+            str: The quoted ETag.
+        """
+        return f'"{self.digest}{ETAG_SUFFIXES.get(encoding, "")}"'
+
+    def response(self, request: Request, cache_control: str | None = None) -> Response:
+        """
+        Build the response for a request, honouring If-None-Match, Range and Accept-Encoding.
+
+        Parameters:
+            request (Request): The incoming request.
+            cache_control (str | None): Overrides the file's Cache-Control header.
+
+        Returns:
+            Response: 304 when the client's copy is current, 206/416 for range requests of
+            the uncompressed file, otherwise the best accepted variant.
+        """
+        self.refresh()
+        range_header = request.headers.get("range")
+        if_range = request.headers.get("if-range")
+        if range_header and if_range not in (None, self.etag(None)):
+            range_header = None  # the client's partial copy is stale: send the whole file
+        # Ranges are served from the uncompressed file
+        encoding = (
+            None if range_header else negotiate_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        )
+        headers = {
+            "ETag": self.etag(encoding),
+            "Cache-Control": cache_control or self.cache_control,
+            "Vary": "Accept-Encoding",
+            "Accept-Ranges": "bytes",
+        }
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match:
+            tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+            if "*" in tags or headers["ETag"] in tags:
+                return Response(status_code=304, headers=headers)
+
+        if range_header:
+            span = parse_range(range_header, len(self.body))
+            if span is None:
+                headers["Content-Range"] = f"bytes */{len(self.body)}"
+                return Response(status_code=416, headers=headers)
+            if span != "all":
+                start, end = span
+                headers["Content-Range"] = f"bytes {start}-{end}/{len(self.body)}"
+                return Response(
+                    self.body[start : end + 1], status_code=206, media_type=self.media_type, headers=headers
+                )
+
+        if encoding is None:
+            return Response(self.body, media_type=self.media_type, headers=headers)
+        headers["Content-Encoding"] = encoding
+        return Response(self.variants[encoding], media_type=self.media_type, headers=headers)
+
+
+def is_compressed_media(media_type: str) -> bool:
+    """
+    Tell whether content of a media type is already compressed, so compressing it again is wasted work.
+
+    Parameters:
+        media_type (str): The content type, parameters (e.g. "; charset=utf-8") allowed.
+
+    Returns:
+        bool: True for images, fonts, archives, audio and video in compressed formats.
+    """
+    base = media_type.partition(";")[0].strip().lower()
+    return base in COMPRESSED_MEDIA_TYPES or base.startswith(COMPRESSED_MEDIA_PREFIXES)
+
+
+def negotiate_encoding(accept_encoding: str, available: dict[str, bytes]) -> str | None:
+    """
+    Pick the preferred content coding that is both accepted by the client and available.
+
+    Parameters:
+        accept_encoding (str): The request's Accept-Encoding header.
+        available (dict[str, bytes]): Prepared variants keyed by coding.
+
+    Returns:
+        str | None: "br", "gzip" or None for the uncompressed body.
+    """
+    accepted = set()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        if params.strip().replace(" ", "") in {"q=0", "q=0.0", "q=0.00", "q=0.000"}:
+            continue
+        accepted.add(coding.strip().lower())
+    for encoding in ENCODINGS:
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+def parse_range(range_header: str, size: int) -> tuple[int, int] | str | None:
+    """
+    Resolve a Range header against a body of `size` bytes.
+
+    Parameters:
+        range_header (str): The request's Range header.
+        size (int): Length of the full body.
+
+    Returns:
+        tuple[int, int] | str | None: Inclusive (start, end) for a single satisfiable range,
+        "all" when the header should be ignored (multiple ranges or unknown syntax), and
+        None when the range cannot be satisfied.
+    """
+    match = BYTE_RANGE.fullmatch(range_header.strip())
+    if match is None or match.group(1) == match.group(2) == "":
+        return "all"
+    first, last = match.groups()
+    if first == "":
+        length = int(last)
+        if length == 0:
+            return None
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return None
+    return start, end
+
+
+class AssetStore:
+    """
+    The static files of one directory, held in memory and served under content-hashed names.
+
+    Every file is reachable under its plain relative path (revalidated with its ETag on each
+    use) and under a hashed name such as "static/mouse_pointer.3f9c0e1a2b.png" that is served
+    with IMMUTABLE_CACHE_CONTROL, so browsers reuse it without revalidating. Files are read
+    once when the store is created; edits to them are picked up by mtime and give the file a
+    new hashed name. Older hashed names stop resolving, so an immutable URL never serves
+    other bytes than the ones it was named after. Pages linking to the files should reload
+    when `version` changes, to link to the new names; it checks the files for edits at most
+    once per ASSET_CHECK_INTERVAL, so it is cheap enough to call on every page request.
+
+    Parameters:
+        directory (str): The directory to serve.
+        prefix (str): The URL prefix the store is mounted under, e.g. "/resource/".
+    """
+
+    def __init__(self, directory: str, prefix: str):
+        self.prefix = prefix
+        self.files: dict[str, CachedFile] = {}
+        # Hashed name -> (file, digest prefix embedded in the name)
+        self.hashed: dict[str, tuple[CachedFile, str]] = {}
+        # When version() last checked the files for edits (time.monotonic())
+        self.checked = 0.0
+        for root, _, names in os.walk(directory):
+            for name in names:
+                path = os.path.join(root, name)
+                relative = os.path.relpath(path, directory).replace(os.sep, "/")
+                media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+                self.files[relative] = CachedFile(path, media_type)
+                self.url(relative)
+
+    def url(self, path: str) -> str:
+        """
+        Content-hashed URL of a file.
+
+        Parameters:
+            path (str): The file's path relative to the served directory.
+
+        Returns:
+            str: The URL, including the store's prefix.
+        """
+        file = self.files[path]
+        file.refresh()
+        digest = file.digest[:HASHED_NAME_DIGITS]
+        stem, ext = os.path.splitext(path)
+        name = f"{stem}.{digest}{ext}"
+        self.hashed[name] = (file, digest)
+        return self.prefix + name
+
+    def version(self) -> int:
+        """
+        Counter of the store's file reloads, checking the files for edits if they were not
+        checked in the last ASSET_CHECK_INTERVAL.
+
+        Returns:
+            int: The number of times any file was loaded; it grows whenever a file's content
+            is reloaded, whether by this check or by serving the file.
+        """
+        now = time.monotonic()
+        if now - self.checked >= ASSET_CHECK_INTERVAL:
+            self.checked = now
+            for file in self.files.values():
+                file.refresh()
+        return sum(file.loads for file in self.files.values())
+
+    def get(self, name: str) -> tuple[CachedFile, bool] | None:
+        """
+        Look a requested file up by hashed or plain name.
+
+        Parameters:
+            name (str): The requested path relative to the prefix.
+
+        Returns:
+            tuple[CachedFile, bool] | None: The file and whether it was requested by its hashed
+            (immutable) name, or None if there is no such file or the hashed name belongs to
+            an older version of the file.
+        """
+        if name in self.hashed:
+            file, digest = self.hashed[name]
+            file.refresh()
+            if file.digest[:HASHED_NAME_DIGITS] != digest:
+                del self.hashed[name]
+                return None
+            return file, True
+        if name in self.files:
+            return self.files[name], False
+        return None
+
+    def rewrite_urls(self, html: bytes) -> bytes:
+        """
+        Point every "<prefix>path" reference in a page at the file's hashed URL.
+
+        Parameters:
+            html (bytes): The page content.
+
+        Returns:
+            bytes: The page with references to known files replaced; unknown ones are kept.
+        """
+        prefix = self.prefix.lstrip("/")
+        pattern = re.compile(rb"(/?)" + re.escape(prefix.encode()) + rb"([\w./-]+)")
+
+        def replace(match: re.Match) -> bytes:
+            path = match.group(2).decode()
+            if path not in self.files:
+                return match.group(0)
+            return match.group(1) + self.url(path).lstrip("/").encode()
+
+        return pattern.sub(replace, html)
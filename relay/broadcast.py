@@ -0,0 +1,280 @@
+import asyncio
+import json
+import time
+from collections import deque
+
+from fastapi import WebSocket
+from fastapi import WebSocketDisconnect
+
+from .frames import TRACE_KEY
+from .frames import Frame
+from .stats import RelayStats
+from .tracing import now_ms
+
+# Maximum number of frames waiting to be written to a single client
+# Once full, the oldest pending frame is dropped so the sender never waits on a slow peer
+OUTBOUND_QUEUE_SIZE = 64
+
+# Maximum number of bytes waiting to be written to a single client, dropped oldest first like above
+# Together with MAX_FRAME_BYTES this bounds the relay's memory per connection
+OUTBOUND_BYTE_BUDGET = 512 * 1024
+
+# Seconds a single send may take before the client is considered stalled and evicted
+SEND_TIMEOUT = 2.0
+
+# Number of frames a client may lose to a full queue before it is evicted as a slow consumer
+# Counted since its queue last drained, so a client that falls behind now and then but catches
+# up is never evicted for drops accumulated over hours
+MAX_DROPPED_FRAMES = 256
+
+# Close code sent to evicted clients (1013: "Try Again Later")
+EVICTED_CLOSE_CODE = 1013
+
+
+class Client:
+    """
+    A connected WebSocket peer with its own outbound queue and writer task.
+
+    Frames are appended to the queue without awaiting, and a dedicated writer task
+    drains it, so a slow or stalled peer only ever delays itself. While the client is
+    behind, cursor moves queued back to back are merged into one frame carrying the summed
+    delta, since only the latest position matters; drags and clicks stay lossless.
+
+    Parameters:
+        websocket (WebSocket): The accepted WebSocket connection.
+        hub (Hub): The hub this client belongs to.
+        room (str): The pairing session this client joined.
+        binary (bool): Whether the client negotiated binary gesture frames.
+    """
+
+    def __init__(self, websocket: WebSocket, hub: "Hub", room: str, binary: bool = False):
+        self.websocket = websocket
+        self.hub = hub
+        self.room = room
+        self.binary = binary
+        self.id = hub.next_id
+        self.outbound: deque[Frame] = deque()
+        self.queued_bytes = 0
+        self.sending_bytes = 0
+        self.pending = asyncio.Event()
+        self.dropped = 0
+        # Frames dropped since the outbound queue was last empty
+        self.backlog_dropped = 0
+        self.merged = 0
+        self.closed = False
+        self.evicted = False
+        self.writer: asyncio.Task | None = None
+
+    @property
+    def bytes_in_flight(self) -> int:
+        """Bytes queued for this client plus the frame currently being written to it."""
+        return self.queued_bytes + self.sending_bytes
+
+    def start(self):
+        """Start the writer task that drains the outbound queue."""
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, frame: Frame):
+        """
+        Queue a frame for this client without blocking the caller.
+
+        Parameters:
+            frame (Frame): The frame to deliver.
+
+        Notes:
+            - A cursor move is merged into the last pending frame when both share a coalesce key.
+            - When the queue holds more than OUTBOUND_QUEUE_SIZE frames or OUTBOUND_BYTE_BUDGET
+              bytes, the oldest frames are discarded (degraded delivery).
+            - After MAX_DROPPED_FRAMES frames discarded without the queue draining in between,
+              the client is evicted.
+        """
+        if self.closed:
+            return
+        if self.outbound:
+            key = frame.coalesce_key()
+            if key is not None and self.outbound[-1].coalesce_key() == key:
+                pending = self.outbound[-1]
+                self.outbound[-1] = pending.merge(frame)
+                self.queued_bytes += self.outbound[-1].size - pending.size
+                self.merged += 1
+                self.hub.merged += 1
+                return
+        self.outbound.append(frame)
+        self.queued_bytes += frame.size
+        while self.outbound and (len(self.outbound) > OUTBOUND_QUEUE_SIZE or self.queued_bytes > OUTBOUND_BYTE_BUDGET):
+            self.queued_bytes -= self.outbound.popleft().size
+            self.dropped += 1
+            self.backlog_dropped += 1
+            self.hub.stats.frames_dropped += 1
+        if self.backlog_dropped > MAX_DROPPED_FRAMES:
+            self.evict("slow_consumer")
+            return
+        self.pending.set()
+
+    def evict(self, reason: str):
+        """
+        Drop a slow consumer from the hub and let its writer task close the socket.
+
+        Parameters:
+            reason (str): Why, one of LOST_CLIENT_REASONS in relay.stats.
+        """
+        if self.closed:
+            return
+        self.hub.stats.lost_clients[reason] += 1
+        self.closed = True
+        self.evicted = True
+        self.outbound.clear()
+        self.queued_bytes = 0
+        self.hub.remove(self)
+        self.pending.set()
+
+    async def close(self):
+        """Stop the writer task and remove the client from the hub."""
+        self.closed = True
+        self.hub.remove(self)
+        if self.writer is not None and not self.writer.done():
+            self.writer.cancel()
+
+    async def _write_loop(self):
+        """
+        Deliver queued frames one at a time, each bounded by SEND_TIMEOUT.
+
+        Binary frames are forwarded unchanged to clients that negotiated them and
+        transcoded to JSON text for everyone else. Traced gesture frames are re-encoded
+        per client with the time they are handed to its socket.
+
+        Effects:
+            - Counts sent frames and bytes and times each send (see RelayStats).
+            - Evicts the client when a send times out.
+            - Closes the socket with EVICTED_CLOSE_CODE once evicted.
+        """
+        try:
+            while not self.closed:
+                if not self.outbound:
+                    self.backlog_dropped = 0  # caught up
+                    self.pending.clear()
+                    await self.pending.wait()
+                    continue
+                frame = self.outbound.popleft()
+                self.queued_bytes -= frame.size
+                trace = frame.trace
+                if trace is not None:
+                    payload = {**frame.payload, TRACE_KEY: {**trace, "relay_out": now_ms()}}
+                    send = self.websocket.send_text(json.dumps(payload))
+                elif self.binary and isinstance(frame.data, bytes):
+                    send = self.websocket.send_bytes(frame.data)
+                elif frame.text is not None:
+                    send = self.websocket.send_text(frame.text)
+                else:
+                    continue  # undecodable binary frame for a JSON-only client
+                self.sending_bytes = frame.size
+                stats = self.hub.stats
+                started = time.perf_counter()
+                try:
+                    await asyncio.wait_for(send, SEND_TIMEOUT)
+                except TimeoutError:
+                    self.evict("send_timeout")
+                else:
+                    stats.send_latency.observe(time.perf_counter() - started)
+                    stats.frames_sent += 1
+                    stats.bytes_sent += frame.size
+                finally:
+                    self.sending_bytes = 0
+        except (WebSocketDisconnect, RuntimeError, OSError):
+            # The peer went away mid-send; the endpoint's receive loop cleans up
+            if not self.closed:
+                self.hub.stats.lost_clients["send_error"] += 1
+            self.closed = True
+            self.hub.remove(self)
+            return
+
+        if self.evicted:
+            try:
+                await asyncio.wait_for(self.websocket.close(code=EVICTED_CLOSE_CODE), SEND_TIMEOUT)
+            except (TimeoutError, WebSocketDisconnect, RuntimeError, OSError):
+                pass
+
+
+class Hub:
+    """
+    Registry of connected clients, grouped into rooms, that fans frames out concurrently.
+
+    Each room is one pairing session (a phone and the browser tabs it drives), keyed by
+    the session token. Frames are only routed within the sender's room, so the cost of a
+    message depends on the size of that room rather than on every socket on the server.
+    Broadcasting only appends to each peer's outbound queue, so the sender never waits
+    on how fast peers read.
+    """
+
+    def __init__(self):
+        self.rooms: dict[str, set[Client]] = {}
+        # Id given to the next client that joins, used to tell connections apart in metrics
+        self.next_id = 0
+        # Total number of frames folded into a pending frame, across all clients
+        self.merged = 0
+        # Relay-wide counters and histograms that outlive the clients they count
+        self.stats = RelayStats()
+
+    def join(self, websocket: WebSocket, room: str, binary: bool = False) -> Client:
+        """
+        Register an accepted WebSocket in a room and start its writer task.
+
+        Parameters:
+            websocket (WebSocket): The accepted WebSocket connection.
+            room (str): The session token of the room to join. Created on first use.
+            binary (bool): Whether the client negotiated binary gesture frames.
+
+        Returns:
+            Client: The client wrapping the connection.
+        """
+        client = Client(websocket, self, room, binary)
+        self.next_id += 1
+        self.stats.connections += 1
+        self.rooms.setdefault(room, set()).add(client)
+        client.start()
+        return client
+
+    def remove(self, client: Client):
+        """
+        Drop a client from its room, deleting the room once it is empty.
+
+        Parameters:
+            client (Client): The client to remove.
+        """
+        peers = self.rooms.get(client.room)
+        if peers is None:
+            return
+        peers.discard(client)
+        if not peers:
+            del self.rooms[client.room]
+
+    async def leave(self, client: Client):
+        """
+        Unregister a client and stop its writer task.
+
+        Parameters:
+            client (Client): The client that disconnected.
+        """
+        await client.close()
+
+    def clients(self) -> list[Client]:
+        """
+        Every connected client, across all rooms.
+
+        Returns:
+            list[Client]: The clients, in no particular order.
+        """
+        return [client for peers in self.rooms.values() for client in peers]
+
+    def broadcast(self, sender: Client, frame: Frame):
+        """
+        Queue a frame for every client in the sender's room except the sender.
+
+        Parameters:
+            sender (Client): The client the frame came from.
+            frame (Frame): The frame to forward, JSON text or binary gesture frame(s).
+        """
+        # Iterate over a snapshot: enqueue() may evict a client and shrink the set
+        for client in tuple(self.rooms.get(sender.room, ())):
+            if client is not sender:
+                client.enqueue(frame)
@@ -0,0 +1,116 @@
+import json
+
+from .wire import GESTURE_FRAME
+from .wire import GESTURE_TYPES
+from .wire import decode_gesture
+from .wire import decode_gestures
+from .wire import encode_gesture
+
+# Gesture types whose frames may be collapsed while a client is behind
+# Their x/y are relative deltas, so merging two pending frames means summing them
+COALESCIBLE_TYPES = {"touch", "scroll", "move"}
+
+# Key of the latency trace object in a traced JSON gesture frame (see relay.tracing)
+TRACE_KEY = "trace"
+
+
+class Frame:
+    """
+    A frame received from one client, waiting to be relayed to its peers.
+
+    Frames are either JSON text or binary gesture frames (see `relay.wire`), and either may
+    be a batch: a JSON array or several binary frames back to back. The payload is only
+    decoded when it is needed, to decide whether the frame can be merged into a pending one
+    or to transcode a binary frame for a JSON-only peer, and is then cached so every peer
+    shares the same decode. Batches are never merged, and neither are traced gestures.
+
+    Parameters:
+        data (str | bytes): The raw frame as received.
+        payload (dict | None): The already decoded payload, if known.
+    """
+
+    __slots__ = ("data", "size", "traced", "_decoded", "_parsed", "_text")
+
+    def __init__(self, data: str | bytes, payload: dict | None = None):
+        self.data = data
+        # Size on the wire, in bytes
+        self.size = len(data) if isinstance(data, bytes) else len(data.encode())
+        # Cheap pre-check so untraced frames never need decoding to find a trace
+        self.traced = isinstance(data, str) and f'"{TRACE_KEY}"' in data
+        self._decoded = payload
+        self._parsed = payload is not None
+        self._text = data if isinstance(data, str) else None
+
+    @property
+    def decoded(self) -> dict | list | None:
+        """The decoded JSON value or gesture(s), or None if the frame cannot be decoded."""
+        if not self._parsed:
+            self._parsed = True
+            try:
+                if not isinstance(self.data, bytes):
+                    self._decoded = json.loads(self.data)
+                elif len(self.data) == GESTURE_FRAME.size:
+                    self._decoded = decode_gesture(self.data)
+                else:
+                    self._decoded = decode_gestures(self.data)
+            except ValueError:
+                self._decoded = None
+        return self._decoded
+
+    @property
+    def payload(self) -> dict | None:
+        """The decoded object of a single gesture/JSON frame, None for batches and undecodable frames."""
+        decoded = self.decoded
+        return decoded if isinstance(decoded, dict) else None
+
+    @property
+    def text(self) -> str | None:
+        """The frame as JSON text, transcoding binary frames; None if it cannot be decoded."""
+        if self._text is None and self.decoded is not None:
+            self._text = json.dumps(self.decoded)
+        return self._text
+
+    @property
+    def trace(self) -> dict | None:
+        """The latency trace timestamps of a traced JSON gesture frame, None for every other frame."""
+        if not self.traced:
+            return None
+        payload = self.payload
+        if payload is None or payload.get("type") not in GESTURE_TYPES or not isinstance(payload.get(TRACE_KEY), dict):
+            return None
+        return payload[TRACE_KEY]
+
+    def coalesce_key(self) -> tuple | None:
+        """
+        Identify which pending frames this one may be merged with.
+
+        Returns:
+            tuple | None: (type, fingers) for a cursor move without a click, None for frames
+            that must be delivered losslessly (drag, click, copied_text, traced, anything unknown).
+        """
+        payload = self.payload
+        if payload is None or payload.get("type") not in COALESCIBLE_TYPES or payload.get("click") or self.traced:
+            return None
+        if not isinstance(payload.get("x"), int | float) or not isinstance(payload.get("y"), int | float):
+            return None
+        return payload["type"], payload.get("fingers")
+
+    def merge(self, newer: "Frame") -> "Frame":
+        """
+        Combine this pending frame with a newer one of the same coalesce key.
+
+        Parameters:
+            newer (Frame): The frame that arrived after this one.
+
+        Returns:
+            Frame: The newer frame, in the newer frame's encoding, with the x/y deltas of both summed.
+        """
+        payload = dict(newer.payload)
+        payload["x"] = self.payload["x"] + payload["x"]
+        payload["y"] = self.payload["y"] + payload["y"]
+        if isinstance(newer.data, bytes):
+            data = encode_gesture(
+                payload["seq"], payload["x"], payload["y"], payload["click"], payload["fingers"], payload["type"]
+            )
+            return Frame(data, payload)
+        return Frame(json.dumps(payload), payload)
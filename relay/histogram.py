@@ -0,0 +1,50 @@
+from bisect import bisect_left
+
+
+class Histogram:
+    """
+    Counts of observed values per bucket, in the shape of a Prometheus histogram.
+
+    Observing is a bisect and two additions, cheap enough to do inline on the relay's hot
+    path. Counts are kept per bucket and made cumulative only when rendered.
+
+    Parameters:
+        buckets (tuple[float, ...]): Upper bounds of the buckets, ascending. Values above the
+            last bound only count towards the +Inf bucket.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        """
+        Record one value.
+
+        Parameters:
+            value (float): The observed value, in the unit of the bucket bounds.
+        """
+        self.count += 1
+        self.sum += value
+        index = bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """
+        The bucket counts as Prometheus reports them.
+
+        Returns:
+            list[tuple[str, int]]: (le, count of values <= le) per bucket, ending with ("+Inf", count).
+        """
+        total = 0
+        buckets = []
+        for bound, count in zip(self.buckets, self.counts, strict=True):
+            total += count
+            buckets.append((str(bound), total))
+        buckets.append(("+Inf", self.count))
+        return buckets
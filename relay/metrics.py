@@ -0,0 +1,160 @@
+from .broadcast import Hub
+from .histogram import Histogram
+from .tracing import LatencyTracer
+
+# Content type of the Prometheus text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def format_metric(name: str, type_: str, help_: str, samples: list[tuple[dict, float]]) -> list[str]:
+    """
+    Format one metric family in the Prometheus text exposition format.
+
+    Parameters:
+        name (str): The metric name.
+        type_ (str): "counter", "gauge" or "histogram".
+        help_ (str): One line describing the metric.
+        samples (list[tuple[dict, float]]): (labels, value) pairs.
+
+    Returns:
+        list[str]: The HELP and TYPE lines followed by one line per sample.
+    """
+    lines = [f"# HELP {name} {help_}", f"# TYPE {name} {type_}"]
+    for labels, value in samples:
+        label_text = ",".join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+    return lines
+
+
+def format_histogram(name: str, help_: str, histograms: list[tuple[dict, Histogram]]) -> list[str]:
+    """
+    Format one histogram metric family in the Prometheus text exposition format.
+
+    Parameters:
+        name (str): The metric name, without the _bucket/_sum/_count suffixes.
+        help_ (str): One line describing the metric.
+        histograms (list[tuple[dict, Histogram]]): (labels, histogram) pairs.
+
+    Returns:
+        list[str]: The HELP and TYPE lines followed by the bucket, sum and count lines of each histogram.
+    """
+    lines = [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms:
+        label_text = "".join(f'{key}="{label}",' for key, label in labels.items())
+        for le, count in histogram.cumulative():
+            lines.append(f'{name}_bucket{{{label_text}le="{le}"}} {count}')
+        label_text = f"{{{label_text.rstrip(',')}}}" if label_text else ""
+        lines.append(f"{name}_sum{label_text} {histogram.sum}")
+        lines.append(f"{name}_count{label_text} {histogram.count}")
+    return lines
+
+
+def render_metrics(hub: Hub, tracer: LatencyTracer) -> str:
+    """
+    Render the relay's current state as Prometheus metrics.
+
+    Parameters:
+        hub (Hub): The hub to report on.
+        tracer (LatencyTracer): The latency histograms of traced gestures.
+
+    Returns:
+        str: The metrics in the Prometheus text exposition format.
+
+    Notes:
+        - Per-connection metrics are labelled with the client id, never the session token,
+          since the token is what lets a device join a pairing session.
+    """
+    clients = sorted(hub.clients(), key=lambda client: client.id)
+    stats = hub.stats
+    lines = [
+        *format_metric("misclick_connected_clients", "gauge", "Connected WebSocket clients.", [({}, len(clients))]),
+        *format_metric(
+            "misclick_rooms", "gauge", "Pairing sessions with at least one client.", [({}, len(hub.rooms))]
+        ),
+        *format_metric(
+            "misclick_client_bytes_in_flight",
+            "gauge",
+            "Bytes queued for or being written to a connection.",
+            [({"client": client.id}, client.bytes_in_flight) for client in clients],
+        ),
+        *format_metric(
+            "misclick_client_queued_frames",
+            "gauge",
+            "Frames waiting in a connection's outbound queue.",
+            [({"client": client.id}, len(client.outbound)) for client in clients],
+        ),
+        *format_metric(
+            "misclick_client_dropped_frames_total",
+            "counter",
+            "Frames discarded from a connection's full outbound queue.",
+            [({"client": client.id}, client.dropped) for client in clients],
+        ),
+        *format_metric(
+            "misclick_frames_merged_total",
+            "counter",
+            "Cursor-move frames merged into a pending frame, across all connections.",
+            [({}, hub.merged)],
+        ),
+        *format_metric(
+            "misclick_connections_total", "counter", "WebSocket connections accepted.", [({}, stats.connections)]
+        ),
+        *format_metric(
+            "misclick_messages_received_total",
+            "counter",
+            "Messages received for relaying, per type (batches count each message).",
+            [({"type": type_}, count) for type_, count in stats.messages.items()],
+        ),
+        *format_metric(
+            "misclick_message_bytes_received_total",
+            "counter",
+            "Bytes received for relaying, per message type.",
+            [({"type": type_}, count) for type_, count in stats.message_bytes.items()],
+        ),
+        *format_metric(
+            "misclick_frames_sent_total", "counter", "Frames written to clients.", [({}, stats.frames_sent)]
+        ),
+        *format_metric(
+            "misclick_bytes_sent_total",
+            "counter",
+            "Bytes of the frames written to clients, as received.",
+            [({}, stats.bytes_sent)],
+        ),
+        *format_metric(
+            "misclick_frames_dropped_total",
+            "counter",
+            "Frames discarded from full outbound queues, across all connections.",
+            [({}, stats.frames_dropped)],
+        ),
+        *format_metric(
+            "misclick_clients_lost_total",
+            "counter",
+            "Clients removed by the relay, per reason.",
+            [({"reason": reason}, count) for reason, count in stats.lost_clients.items()],
+        ),
+        *format_histogram(
+            "misclick_send_duration_seconds", "Duration of each send to a client.", [({}, stats.send_latency)]
+        ),
+        *format_metric(
+            "misclick_event_loop_lag_seconds",
+            "gauge",
+            "How late the event loop ran the last lag probe.",
+            [({}, stats.last_loop_lag)],
+        ),
+        *format_histogram(
+            "misclick_event_loop_lag_probe_seconds",
+            "How late the event loop ran each lag probe.",
+            [({}, stats.loop_lag)],
+        ),
+        *format_metric(
+            "misclick_trace_reports_total",
+            "counter",
+            "Latency traces reported by the extension after painting a traced gesture.",
+            [({}, tracer.reports)],
+        ),
+        *format_histogram(
+            "misclick_gesture_latency_seconds",
+            "Latency of traced gestures per stage, from the phone's touch event to the cursor paint.",
+            [({"stage": stage}, histogram) for stage, histogram in tracer.histograms.items()],
+        ),
+    ]
+    return "\n".join(lines) + "\n"
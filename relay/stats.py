@@ -0,0 +1,129 @@
+import asyncio
+
+from .frames import Frame
+from .histogram import Histogram
+from .wire import GESTURE_FRAME
+from .wire import GESTURE_TYPES
+
+# Message types counted per type; anything else a client sends is counted as "other",
+# so clients cannot grow the set of metric labels
+MESSAGE_TYPES = [*GESTURE_TYPES, "copied_text", "other"]
+
+# Start of copied text frames as the extension's json.dumps writes them; these frames (up to
+# MAX_FRAME_BYTES each) are counted without decoding them
+COPIED_TEXT_PREFIXES = ('{"copied_text":', '{"copied_text_chunk":')
+
+# Why a client was removed other than by disconnecting itself
+#   slow_consumer  lost more than MAX_DROPPED_FRAMES frames to a full queue
+#   send_timeout   a single send took longer than SEND_TIMEOUT
+#   send_error     the connection failed while a frame was being written
+LOST_CLIENT_REASONS = ["slow_consumer", "send_timeout", "send_error"]
+
+# Upper bounds (seconds) of the send latency histogram buckets; sends time out at SEND_TIMEOUT (2 s)
+SEND_LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.1, 0.5, 2.0)
+
+# Seconds between event loop lag probes
+LOOP_LAG_INTERVAL = 0.5
+
+# Upper bounds (seconds) of the event loop lag histogram buckets
+LOOP_LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+def message_type(payload: dict) -> str:
+    """
+    Classify a decoded JSON message for the per-type counters.
+
+    Parameters:
+        payload (dict): The decoded message.
+
+    Returns:
+        str: One of MESSAGE_TYPES.
+    """
+    type_ = payload.get("type")
+    if type_ in GESTURE_TYPES:
+        return type_
+    if "copied_text" in payload or "copied_text_chunk" in payload:
+        return "copied_text"
+    return "other"
+
+
+class RelayStats:
+    """
+    Relay-wide counters and histograms, reported on /metrics.
+
+    Unlike the per-connection gauges, these outlive the clients they count. They are
+    plain attributes updated inline where the event happens: the relay runs on a single
+    event loop, so increments never race and need no locks.
+    """
+
+    def __init__(self):
+        # Messages and bytes received for relaying, per message type
+        self.messages = dict.fromkeys(MESSAGE_TYPES, 0)
+        self.message_bytes = dict.fromkeys(MESSAGE_TYPES, 0)
+        # Frames and bytes written to clients, across all connections
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        # Frames discarded from full outbound queues, across all connections
+        self.frames_dropped = 0
+        # Connections accepted, and clients removed by the relay, per reason
+        self.connections = 0
+        self.lost_clients = dict.fromkeys(LOST_CLIENT_REASONS, 0)
+        # Duration of each send to a client, in seconds
+        self.send_latency = Histogram(SEND_LATENCY_BUCKETS)
+        # How late the event loop ran the lag probe, in seconds
+        self.loop_lag = Histogram(LOOP_LAG_BUCKETS)
+        self.last_loop_lag = 0.0
+
+    def count_received(self, frame: Frame):
+        """
+        Count a frame received for relaying, per message type.
+
+        Parameters:
+            frame (Frame): The frame. Batches count each message; a JSON batch's size is split
+                evenly between its messages (rounded down).
+
+        Notes:
+            - Binary frames and copied text frames are classified without decoding them.
+        """
+        if isinstance(frame.data, bytes):
+            size = GESTURE_FRAME.size
+            if frame.size % size:
+                self.messages["other"] += 1
+                self.message_bytes["other"] += frame.size
+                return
+            # The gesture type is in bits 1-2 of the last byte of each 13-byte frame
+            for flags in frame.data[size - 1 :: size]:
+                type_ = GESTURE_TYPES[flags >> 1 & 0b11]
+                self.messages[type_] += 1
+                self.message_bytes[type_] += size
+            return
+        if frame.data.startswith(COPIED_TEXT_PREFIXES):
+            self.messages["copied_text"] += 1
+            self.message_bytes["copied_text"] += frame.size
+            return
+        decoded = frame.decoded
+        payloads = decoded if isinstance(decoded, list) and decoded else [decoded]
+        size = frame.size // len(payloads)
+        for payload in payloads:
+            type_ = message_type(payload) if isinstance(payload, dict) else "other"
+            self.messages[type_] += 1
+            self.message_bytes[type_] += size
+
+
+async def watch_event_loop(stats: RelayStats):
+    """
+    Measure event loop lag until cancelled.
+
+    Parameters:
+        stats (RelayStats): Where to record the lag.
+
+    Notes:
+        - Sleeps LOOP_LAG_INTERVAL at a time; how much later than that it wakes up is the time
+          callbacks waited for the loop, which delays every relayed frame by as much.
+    """
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        stats.last_loop_lag = max(loop.time() - start - LOOP_LAG_INTERVAL, 0.0)
+        stats.loop_lag.observe(stats.last_loop_lag)
@@ -0,0 +1,117 @@
+import json
+import time
+from typing import TYPE_CHECKING
+
+from .frames import Frame
+from .histogram import Histogram
+
+if TYPE_CHECKING:
+    from .broadcast import Client
+
+# Message types clients send to the relay itself; they are answered or recorded, never relayed
+#   ping:         {"type": "ping", "t": <client clock, ms>}, answered with
+#                 {"type": "pong", "t": <same>, "relay": <relay clock, ms>} to estimate clock offsets
+#   trace_report: {"type": "trace_report", "trace": {...}}, a traced gesture's timestamps after paint
+CONTROL_TYPES = {"ping", "trace_report"}
+
+# Quoted control types; a text frame containing none of them is not a control frame and is never decoded
+CONTROL_MARKERS = tuple(f'"{type_}"' for type_ in sorted(CONTROL_TYPES))
+
+# Latency stages of a traced gesture: (name, trace key it starts at, trace key it ends at)
+# Every timestamp is in the relay's clock (ms); the phone and extension convert theirs using
+# the offset estimated from ping/pong. Mirrored in browser_extension/utils/latency_overlay.py
+#   touch      input event on the phone (touchend, or the last touchmove of a streamed delta)
+#   send       WebSocket send on the phone, after the batch window
+#   relay_in   frame received by the relay
+#   relay_out  frame handed to the extension's socket by its writer task
+#   receive    frame received in the page by the extension
+#   apply      gesture applied to the cursor state / DOM
+#   paint      first frame after apply rendered (a task queued from its animation frame callback)
+LATENCY_STAGES = [
+    ("input", "touch", "send"),
+    ("uplink", "send", "relay_in"),
+    ("relay", "relay_in", "relay_out"),
+    ("downlink", "relay_out", "receive"),
+    ("apply", "receive", "apply"),
+    ("paint", "apply", "paint"),
+    ("total", "touch", "paint"),
+]
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def now_ms() -> float:
+    """
+    Current time in the relay's clock, the reference clock of latency traces.
+
+    Returns:
+        float: Milliseconds since the Unix epoch, with sub-millisecond resolution.
+    """
+    return time.time_ns() / 1e6
+
+
+class LatencyTracer:
+    """
+    Clock reference and latency histograms for traced gestures.
+
+    The phone traces a sample of its gestures by sending them as JSON frames with a "trace"
+    object of timestamps. The relay adds its receive time when the frame arrives and its
+    send time as each writer task hands it to a socket (see Client._write_loop), and the
+    extension reports the completed trace after painting, which is recorded here as one
+    histogram observation per stage. Both ends learn their offset to the relay's clock
+    from ping/pong frames answered here.
+    """
+
+    def __init__(self):
+        self.histograms = {name: Histogram(LATENCY_BUCKETS) for name, _, _ in LATENCY_STAGES}
+        # Trace reports received, including incomplete ones
+        self.reports = 0
+
+    def handle(self, client: "Client", frame: Frame, received: float) -> bool:
+        """
+        Process a frame addressed to the relay itself, or stamp a traced gesture frame.
+
+        Parameters:
+            client (Client): The client the frame came from.
+            frame (Frame): The frame, any kind.
+            received (float): When the frame was received, from now_ms().
+
+        Returns:
+            bool: True for control frames (CONTROL_TYPES), which must not be relayed.
+        """
+        if not isinstance(frame.data, str):
+            return False
+        trace = frame.trace
+        if trace is not None:
+            trace["relay_in"] = received
+            return False
+        # Cheap pre-check like Frame.traced, so e.g. copied text chunks are not decoded here
+        if not any(marker in frame.data for marker in CONTROL_MARKERS):
+            return False
+        payload = frame.payload
+        type_ = payload.get("type") if payload is not None else None
+        if type_ not in CONTROL_TYPES:
+            return False
+        if type_ == "ping":
+            client.enqueue(Frame(json.dumps({"type": "pong", "t": payload.get("t"), "relay": now_ms()})))
+        elif isinstance(payload.get("trace"), dict):
+            self.observe(payload["trace"])
+        return True
+
+    def observe(self, trace: dict):
+        """
+        Record the stage latencies of a completed trace.
+
+        Parameters:
+            trace (dict): Timestamps by trace key, in the relay's clock (ms). Stages whose
+                timestamps are missing are skipped.
+
+        Notes:
+            - Stages that cross devices depend on the estimated clock offsets and may come out
+              slightly negative; they are recorded as 0.
+        """
+        self.reports += 1
+        for name, start, end in LATENCY_STAGES:
+            if isinstance(trace.get(start), int | float) and isinstance(trace.get(end), int | float):
+                self.histograms[name].observe(max(trace[end] - trace[start], 0.0) / 1000)
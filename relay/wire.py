@@ -0,0 +1,83 @@
+import struct
+
+# WebSocket subprotocol a client offers on connect to negotiate binary gesture frames
+# Clients that do not offer it keep receiving JSON text frames
+BINARY_SUBPROTOCOL = "misclick.bin.v1"
+
+# Fixed frame layout, little endian, 13 bytes:
+#   uint32  seq    sequence number assigned by the sender
+#   float32 x      horizontal delta, normalized to the sender's viewport width
+#   float32 y      vertical delta, normalized to the sender's viewport height
+#   uint8   flags  bit 0: click, bits 1-2: gesture type, bits 3-7: number of fingers
+GESTURE_FRAME = struct.Struct("<IffB")
+
+# Gesture type <-> 2-bit code stored in the flags byte
+GESTURE_TYPES = ["touch", "scroll", "drag", "move"]
+GESTURE_CODES = {type_: code for code, type_ in enumerate(GESTURE_TYPES)}
+
+# Largest finger count the flags byte can hold
+MAX_FINGERS = 0x1F
+
+
+def encode_gesture(seq: int, x: float, y: float, click: bool, fingers: int, type_: str) -> bytes:
+    """
+    Pack a gesture into a binary frame.
+
+    Parameters:
+        seq (int): Sequence number, wrapped to 32 bits.
+        x (float): Normalized horizontal delta.
+        y (float): Normalized vertical delta.
+        click (bool): Whether the gesture is a click/tap.
+        fingers (int): Number of fingers, capped at MAX_FINGERS.
+        type_ (str): Gesture type, one of GESTURE_TYPES.
+
+    Returns:
+        bytes: The GESTURE_FRAME encoded frame.
+    """
+    flags = (1 if click else 0) | GESTURE_CODES[type_] << 1 | min(fingers, MAX_FINGERS) << 3
+    return GESTURE_FRAME.pack(seq & 0xFFFFFFFF, x, y, flags)
+
+
+def decode_gesture(data: bytes) -> dict:
+    """
+    Unpack a binary frame into the same shape as the JSON gesture payload.
+
+    Parameters:
+        data (bytes): A GESTURE_FRAME encoded frame.
+
+    Returns:
+        dict: Keys seq, x, y, click (0/1), fingers and type.
+
+    Raises:
+        ValueError: If the frame does not have the GESTURE_FRAME size.
+    """
+    if len(data) != GESTURE_FRAME.size:
+        raise ValueError(f"Expected a {GESTURE_FRAME.size} byte gesture frame, got {len(data)} bytes")
+    seq, x, y, flags = GESTURE_FRAME.unpack(data)
+    return {
+        "seq": seq,
+        "x": x,
+        "y": y,
+        "click": flags & 1,
+        "fingers": flags >> 3,
+        "type": GESTURE_TYPES[flags >> 1 & 0b11],
+    }
+
+
+def decode_gestures(data: bytes) -> list[dict]:
+    """
+    Unpack a batch of concatenated binary frames.
+
+    Parameters:
+        data (bytes): One or more GESTURE_FRAME encoded frames back to back.
+
+    Returns:
+        list[dict]: One decoded gesture per frame, in order.
+
+    Raises:
+        ValueError: If the batch is empty or not a whole number of frames.
+    """
+    size = GESTURE_FRAME.size
+    if not data or len(data) % size:
+        raise ValueError(f"Expected a multiple of {size} bytes, got {len(data)} bytes")
+    return [decode_gesture(data[i : i + size]) for i in range(0, len(data), size)]